@@ -46,3 +46,16 @@ def gatherGLInfo(incExtensions=True, asList=True):
 
     return {'OpenGL':rec}
 
+_glExtensions = None
+def hasGLExtension(*names):
+    """True if the current context supports any of the named extensions"""
+    global _glExtensions
+    if _glExtensions is None:
+        from .raw import gl
+        _glExtensions = frozenset((gl.glGetString(gl.GL_EXTENSIONS) or '').split())
+
+    for name in names:
+        if name in _glExtensions:
+            return True
+    return False
+
@@ -0,0 +1,550 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import itertools
+
+import numpy
+from numpy import asarray, arange, concatenate, repeat, zeros
+
+from .raw import gl
+from .selection import Selector
+from .data.drawArrayViews import drawModes
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Primitive Assembly
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _stripTriangles(n):
+    i = arange(max(n-2, 0))
+    tris = numpy.column_stack([i, i+1, i+2])
+    # keep a consistent winding on the odd triangles
+    odd = tris[1::2]
+    odd[:, [0, 1]] = odd[:, [1, 0]]
+    return tris
+
+def _fanTriangles(n):
+    i = arange(1, max(n-1, 1))
+    return numpy.column_stack([zeros(len(i), int), i, i+1])
+
+def _quadTriangles(n):
+    q = arange(n - n%4).reshape(-1, 4)
+    return concatenate([q[:, [0, 1, 2]], q[:, [0, 2, 3]]])
+
+def _quadStripTriangles(n):
+    i = arange(0, max(n-3, 0), 2)
+    return concatenate([
+        numpy.column_stack([i, i+1, i+3]),
+        numpy.column_stack([i, i+3, i+2])])
+
+def _lineStripSegments(n):
+    i = arange(max(n-1, 0))
+    return numpy.column_stack([i, i+1])
+
+def _lineLoopSegments(n):
+    i = arange(n)
+    return numpy.column_stack([i, (i+1) % max(n, 1)])
+
+primitiveAssembly = {
+    gl.GL_POINTS: lambda n: arange(n).reshape(-1, 1),
+    gl.GL_LINES: lambda n: arange(n - n%2).reshape(-1, 2),
+    gl.GL_LINE_STRIP: _lineStripSegments,
+    gl.GL_LINE_LOOP: _lineLoopSegments,
+    gl.GL_TRIANGLES: lambda n: arange(n - n%3).reshape(-1, 3),
+    gl.GL_TRIANGLE_STRIP: _stripTriangles,
+    gl.GL_TRIANGLE_FAN: _fanTriangles,
+    gl.GL_QUADS: _quadTriangles,
+    gl.GL_QUAD_STRIP: _quadStripTriangles,
+    }
+
+def primitivesFor(mode, elements):
+    """Returns an (N, k) array of vertex indices for the points (k=1), line
+    segments (k=2) or triangles (k=3) that mode draws from elements"""
+    glid_mode = drawModes.get(mode, mode)
+    elements = asarray(elements).ravel()
+    prims = primitiveAssembly[glid_mode](len(elements))
+    return elements[prims]
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Vectorized Geometry Tests
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _dot(a, b):
+    return (a*b).sum(-1)
+
+def _safeInverse(direction, eps=1e-12):
+    direction = numpy.where(abs(direction) < eps, eps, direction)
+    return 1./direction
+
+def _rayBoxHits(lo, hi, origin, invDir, tolerance=0.):
+    t0 = (lo - tolerance - origin)*invDir
+    t1 = (hi + tolerance - origin)*invDir
+    tNear = numpy.minimum(t0, t1).max(-1)
+    tFar = numpy.maximum(t0, t1).min(-1)
+    return (tNear <= tFar) & (tFar >= 0)
+
+def _pointBoxHits(lo, hi, point, radius=0.):
+    return ((lo - radius <= point) & (point <= hi + radius)).all(-1)
+
+def _frustumBoxHits(lo, hi, planes):
+    hits = numpy.ones(len(lo), bool)
+    for plane in planes:
+        n = plane[:3]
+        # the box corner furthest along the plane normal
+        pv = numpy.where(n >= 0, hi, lo)
+        hits &= (_dot(pv, n) + plane[3] >= 0)
+    return hits
+
+def _raySegmentApproach(origin, direction, a, b):
+    """Returns (t, distance) of closest approach between the ray and each
+    segment a->b"""
+    u = b - a
+    w = origin - a
+    aa = _dot(direction, direction)
+    bb = _dot(direction, u)
+    cc = _dot(u, u)
+    dd = _dot(direction, w)
+    ee = _dot(u, w)
+    denom = aa*cc - bb*bb
+    parallel = denom < 1e-12
+    denom = numpy.where(parallel, 1., denom)
+
+    s = numpy.where(parallel, 0., (aa*ee - bb*dd)/denom)
+    s = numpy.clip(s, 0., 1.)
+    t = (bb*s - dd)/aa
+    t = numpy.maximum(t, 0.)
+
+    delta = (origin + t[:, None]*direction) - (a + s[:, None]*u)
+    return t, numpy.sqrt(_dot(delta, delta))
+
+def _rayTriangleHits(origin, direction, v0, v1, v2, eps=1e-12):
+    """Moller-Trumbore over arrays of triangles; returns (mask, t)"""
+    e1 = v1 - v0
+    e2 = v2 - v0
+    p = numpy.cross(direction, e2)
+    det = _dot(e1, p)
+    valid = abs(det) > eps
+    invDet = 1./numpy.where(valid, det, 1.)
+
+    s = origin - v0
+    u = _dot(s, p)*invDet
+    q = numpy.cross(s, e1)
+    v = _dot(direction, q)*invDet
+    t = _dot(e2, q)*invDet
+
+    mask = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return mask, t
+
+def _pointSegmentDistance(point, a, b):
+    u = b - a
+    cc = numpy.maximum(_dot(u, u), 1e-24)
+    s = numpy.clip(_dot(point - a, u)/cc, 0., 1.)
+    delta = point - (a + s[:, None]*u)
+    return numpy.sqrt(_dot(delta, delta))
+
+def _pointTriangleDistance(point, v0, v1, v2):
+    n = numpy.cross(v1 - v0, v2 - v0)
+    nn = numpy.maximum(_dot(n, n), 1e-24)
+    planeDist = _dot(point - v0, n)/numpy.sqrt(nn)
+
+    # barycentric test of the point projected onto the triangle plane
+    inside = numpy.ones(len(v0), bool)
+    for a, b in ((v0, v1), (v1, v2), (v2, v0)):
+        inside &= _dot(numpy.cross(b - a, point - a), n) >= 0
+
+    edgeDist = numpy.minimum(_pointSegmentDistance(point, v0, v1),
+        numpy.minimum(_pointSegmentDistance(point, v1, v2), _pointSegmentDistance(point, v2, v0)))
+    return numpy.where(inside, abs(planeDist), edgeDist)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Bounding Volume Hierarchy
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class BoundingVolumeHierarchy(object):
+    """Axis aligned bounding volume hierarchy over registered point, line and
+    triangle geometry.  Built and queried entirely with numpy, so picks need
+    neither a GL context nor a readback."""
+
+    leafSize = 8
+    tolerance = 0.
+
+    def __init__(self, leafSize=None):
+        if leafSize is not None:
+            self.leafSize = leafSize
+        self._entries = {}
+        self._nextKey = itertools.count(1).next
+        self.invalidate()
+
+    #~ Registration ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def register(self, items, vertices, elements=None, mode=None):
+        """Registers geometry under items.  vertices may be an array or a
+        bound ArrayView; elements may be an index array or a bound
+        DrawArrayView/DrawElementArrayView, which also supplies mode"""
+        if not isinstance(vertices, numpy.ndarray) and hasattr(vertices, 'kind'):
+            # a bound ArrayView; ndarray.data is the raw buffer, not this
+            vertices = vertices.data
+        vertices = asarray(vertices, float)
+        vertices = vertices.reshape(-1, vertices.shape[-1])
+        if vertices.shape[-1] < 3:
+            vertices = numpy.column_stack([vertices, zeros((len(vertices), 3-vertices.shape[-1]))])
+        vertices = vertices[:, :3]
+
+        if getattr(elements, 'glid_mode', None) is not None:
+            mode = elements.glid_mode
+            if elements.kind == 'draw_array':
+                first, count = elements.data[:2]
+                elements = arange(first, first+count)
+            else: elements = elements.data
+        elif elements is None:
+            elements = arange(len(vertices))
+
+        prims = primitivesFor(mode, elements)
+
+        key = self._nextKey()
+        self._entries[key] = (items, vertices, prims)
+        self.invalidate()
+        return key
+
+    def unregister(self, key):
+        del self._entries[key]
+        self.invalidate()
+
+    def clear(self):
+        self._entries.clear()
+        self.invalidate()
+
+    def invalidate(self):
+        self._tree = None
+
+    #~ Construction ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def build(self):
+        tree = self._tree
+        if tree is not None:
+            return tree
+
+        keys = []
+        groups = dict((k, []) for k in (1, 2, 3))
+        for key, (items, vertices, prims) in self._entries.iteritems():
+            if len(prims):
+                keys.append(key)
+                groups[prims.shape[1]].append((len(keys)-1, vertices[prims]))
+
+        # every primitive is stored as a triangle; points and segments
+        # repeat their last vertex and are told apart by primKind
+        primVerts, primOwner, primKind = [], [], []
+        for k, group in groups.iteritems():
+            for ownerIdx, pv in group:
+                if k < 3:
+                    pv = concatenate([pv] + [pv[:, -1:]]*(3-k), 1)
+                primVerts.append(pv)
+                primOwner.append(numpy.repeat(ownerIdx, len(pv)))
+                primKind.append(numpy.repeat(k, len(pv)))
+
+        if primVerts:
+            primVerts = concatenate(primVerts)
+            primOwner = concatenate(primOwner)
+            primKind = concatenate(primKind)
+        else:
+            primVerts = zeros((0, 3, 3))
+            primOwner = zeros(0, int)
+            primKind = zeros(0, int)
+
+        primLo = primVerts.min(1) if len(primVerts) else zeros((0, 3))
+        primHi = primVerts.max(1) if len(primVerts) else zeros((0, 3))
+
+        nodes = ([], [], [], [], [], []) # lo, hi, left, right, start, count
+        order = arange(len(primVerts))
+        if len(order):
+            self._buildNode(nodes, order, 0, len(order), primLo, primHi, (primLo + primHi)*.5)
+
+        tree = dict(
+            keys=keys, primVerts=primVerts, primOwner=primOwner, primKind=primKind,
+            order=order,
+            nodeLo=asarray(nodes[0]).reshape(-1, 3), nodeHi=asarray(nodes[1]).reshape(-1, 3),
+            nodeLeft=asarray(nodes[2], int), nodeRight=asarray(nodes[3], int),
+            nodeStart=asarray(nodes[4], int), nodeCount=asarray(nodes[5], int))
+        self._tree = tree
+        return tree
+
+    def _buildNode(self, nodes, order, start, stop, primLo, primHi, centers):
+        nodeLo, nodeHi, nodeLeft, nodeRight, nodeStart, nodeCount = nodes
+        idx = order[start:stop]
+
+        nodeId = len(nodeLo)
+        nodeLo.append(primLo[idx].min(0))
+        nodeHi.append(primHi[idx].max(0))
+        nodeLeft.append(-1); nodeRight.append(-1)
+        nodeStart.append(start); nodeCount.append(stop-start)
+
+        if stop - start <= self.leafSize:
+            return nodeId
+
+        c = centers[idx]
+        axis = (c.max(0) - c.min(0)).argmax()
+        order[start:stop] = idx[c[:, axis].argsort(kind='mergesort')]
+        mid = (start + stop)//2
+
+        nodeLeft[nodeId] = self._buildNode(nodes, order, start, mid, primLo, primHi, centers)
+        nodeRight[nodeId] = self._buildNode(nodes, order, mid, stop, primLo, primHi, centers)
+        return nodeId
+
+    #~ Traversal ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _candidates(self, tree, nodeHits):
+        """Breadth first traversal testing a whole level of nodes per step.
+        Returns the primitive indices of every leaf that passes nodeHits."""
+        if not len(tree['order']):
+            return zeros(0, int)
+
+        nodeLeft = tree['nodeLeft']
+        frontier = zeros(1, int)
+        leaves = []
+        while len(frontier):
+            frontier = frontier[nodeHits(tree['nodeLo'][frontier], tree['nodeHi'][frontier])]
+            isLeaf = nodeLeft[frontier] < 0
+            leaves.append(frontier[isLeaf])
+            inner = frontier[~isLeaf]
+            frontier = concatenate([nodeLeft[inner], tree['nodeRight'][inner]])
+
+        leaves = concatenate(leaves)
+        counts = tree['nodeCount'][leaves]
+        if not counts.sum():
+            return zeros(0, int)
+        firsts = numpy.cumsum(counts) - counts
+        offsets = arange(counts.sum()) - repeat(firsts, counts)
+        return tree['order'][repeat(tree['nodeStart'][leaves], counts) + offsets]
+
+    def _results(self, tree, prims, depth):
+        """Collapses primitive hits to one (depthRange, items) per registered
+        geometry, nearest first"""
+        if not len(prims):
+            return []
+
+        owners = tree['primOwner'][prims]
+        order = numpy.lexsort((depth, owners))
+        owners = owners[order]; depth = depth[order]
+
+        first = numpy.flatnonzero(numpy.r_[True, owners[1:] != owners[:-1]])
+        depthMin = depth[first]
+        depthMax = numpy.maximum.reduceat(depth, first)
+
+        keys = tree['keys']
+        entries = self._entries
+        result = []
+        for i in depthMin.argsort(kind='mergesort').tolist():
+            items = entries[keys[owners[first[i]]]][0]
+            result.append(((depthMin[i], depthMax[i]), items))
+        return result
+
+    #~ Queries ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def queryRay(self, origin, direction, tolerance=None):
+        """Geometry hit by the ray, nearest first, as (tRange, items).
+        Points and lines hit when within tolerance of the ray; tolerance may
+        be a (t=0, t=1) pair that grows linearly along the ray, as a pick
+        region does under a perspective projection."""
+        if tolerance is None:
+            tolerance = self.tolerance
+        if isinstance(tolerance, (tuple, list)):
+            tolNear, tolFar = tolerance
+        else: tolNear = tolFar = tolerance
+        tolerance = max(tolNear, tolFar)
+        tree = self.build()
+        origin = asarray(origin, float)
+        direction = asarray(direction, float)
+        invDir = _safeInverse(direction)
+
+        prims = self._candidates(tree,
+            lambda lo, hi: _rayBoxHits(lo, hi, origin, invDir, tolerance))
+
+        pv = tree['primVerts'][prims]
+        kind = tree['primKind'][prims]
+        mask, t = _rayTriangleHits(origin, direction, pv[:, 0], pv[:, 1], pv[:, 2])
+
+        thin = kind < 3
+        if thin.any():
+            st, dist = _raySegmentApproach(origin, direction, pv[thin, 0], pv[thin, 1])
+            mask[thin] = dist <= tolNear + (tolFar - tolNear)*st
+            t[thin] = st
+
+        return self._results(tree, prims[mask], t[mask])
+
+    def queryPoint(self, point, radius=None):
+        """Geometry within radius of point, closest first, as (distRange, items)"""
+        if radius is None:
+            radius = self.tolerance
+        tree = self.build()
+        point = asarray(point, float)
+        if len(point) < 3:
+            point = concatenate([point, zeros(3-len(point))])
+
+        prims = self._candidates(tree,
+            lambda lo, hi: _pointBoxHits(lo, hi, point, radius))
+
+        pv = tree['primVerts'][prims]
+        kind = tree['primKind'][prims]
+        dist = numpy.empty(len(prims))
+        thin = kind < 3
+        dist[thin] = _pointSegmentDistance(point, pv[thin, 0], pv[thin, 1])
+        dist[~thin] = _pointTriangleDistance(point, pv[~thin, 0], pv[~thin, 1], pv[~thin, 2])
+
+        mask = dist <= radius
+        return self._results(tree, prims[mask], dist[mask])
+
+    def queryFrustum(self, planes, depthPlane=None):
+        """Geometry whose primitive bounds intersect the convex volume given
+        by (N,4) planes with inside where dot(n, x) + d >= 0.  Results are
+        ordered by distance from depthPlane, the near plane by default."""
+        tree = self.build()
+        planes = asarray(planes, float)
+        if depthPlane is None:
+            depthPlane = planes[-2] if len(planes) >= 6 else planes[0]
+
+        prims = self._candidates(tree,
+            lambda lo, hi: _frustumBoxHits(lo, hi, planes))
+
+        pv = tree['primVerts'][prims]
+        mask = _frustumBoxHits(pv.min(1), pv.max(1), planes)
+        prims = prims[mask]
+        depth = (_dot(pv[mask], depthPlane[:3]) + depthPlane[3]).min(-1)
+        return self._results(tree, prims, depth)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Selector
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class BVHSelector(Selector):
+    """Selector answering picks from a BoundingVolumeHierarchy on the CPU.
+
+    Geometry is registered up front with register(), so load, push and pop
+    are accepted and ignored, and rendering between start and finish is not
+    required.  Point sized picks cast a ray; larger pick rectangles query
+    the pick frustum."""
+
+    pickRect = None
+    viewport = None
+    pickRadius = 2 # pixels; how near a ray pick must pass to points and lines
+
+    def __init__(self, bvh=None):
+        Selector.__init__(self)
+        if bvh is None:
+            bvh = BoundingVolumeHierarchy()
+        self.bvh = bvh
+        self.setMatrices(None, None)
+
+    def register(self, items, vertices, elements=None, mode=None):
+        return self.bvh.register(items, vertices, elements, mode)
+    def unregister(self, key):
+        self.bvh.unregister(key)
+
+    def setMatrices(self, modelview, projection):
+        """Matrices as returned by glGetDoublev (column major); when None they
+        are queried from GL at finish"""
+        self.modelview = modelview
+        self.projection = projection
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def select(self, render=None, incZDepth=False):
+        self.start()
+        if render is not None:
+            render(self)
+        return self.finish(incZDepth)
+
+    def start(self):
+        pass
+
+    def finish(self, incZDepth=False):
+        mvp = self.getMVPMatrix()
+        (cx, cy), (w, h) = self.pickRect
+        if w <= 1 and h <= 1:
+            origin, direction = self.pickRay(mvp, (cx, cy))
+            tolerance = self.pickTolerance(mvp, (cx, cy))
+            hits = self.bvh.queryRay(origin, direction, tolerance)
+        else:
+            hits = self.bvh.queryFrustum(self.pickPlanes(mvp))
+
+        if incZDepth:
+            return [(depth, [items]) for depth, items in hits]
+        return [[items] for depth, items in hits]
+
+    def load(self, *items):
+        pass
+    def push(self, *items):
+        pass
+    def pop(self):
+        pass
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def pickMatrix(self, pos, size, vpbox):
+        self.pickRect = pos, size
+        self.viewport = vpbox
+
+    def _glMatrix(self, pname):
+        m = (gl.GLdouble*16)()
+        gl.glGetDoublev(pname, m)
+        return list(m)
+
+    def getMVPMatrix(self):
+        modelview = self.modelview
+        if modelview is None:
+            modelview = self._glMatrix(gl.GL_MODELVIEW_MATRIX)
+        projection = self.projection
+        if projection is None:
+            projection = self._glMatrix(gl.GL_PROJECTION_MATRIX)
+
+        # GL matrices are column major
+        modelview = asarray(modelview, float).reshape(4, 4).T
+        projection = asarray(projection, float).reshape(4, 4).T
+        return numpy.dot(projection, modelview)
+
+    def pickRay(self, mvp, pos):
+        vx, vy, vw, vh = self.viewport
+        ndc = [2.*(pos[0] - vx)/vw - 1., 2.*(pos[1] - vy)/vh - 1.]
+        inv = numpy.linalg.inv(mvp)
+        near = numpy.dot(inv, ndc + [-1., 1.])
+        far = numpy.dot(inv, ndc + [1., 1.])
+        near = near[:3]/near[3]
+        far = far[:3]/far[3]
+        return near, far - near
+
+    def pickTolerance(self, mvp, pos):
+        """pickRadius unprojected to world units at the near (t=0) and far
+        (t=1) ends of the pick ray"""
+        origin, direction = self.pickRay(mvp, pos)
+        r = self.pickRadius
+        tolNear = tolFar = 0.
+        for offset in ((r, 0), (0, r)):
+            o, d = self.pickRay(mvp, (pos[0] + offset[0], pos[1] + offset[1]))
+            tolNear = max(tolNear, numpy.sqrt(_dot(o - origin, o - origin)))
+            far = (o + d) - (origin + direction)
+            tolFar = max(tolFar, numpy.sqrt(_dot(far, far)))
+        return tolNear, tolFar
+
+    def pickPlanes(self, mvp):
+        (cx, cy), (w, h) = self.pickRect
+        vx, vy, vw, vh = self.viewport
+
+        # same transform as gluPickMatrix
+        pick = numpy.identity(4)
+        pick[0, 0] = float(vw)/w
+        pick[1, 1] = float(vh)/h
+        pick[0, 3] = (vw - 2.*(cx - vx))/w
+        pick[1, 3] = (vh - 2.*(cy - vy))/h
+        m = numpy.dot(pick, mvp)
+
+        return asarray([
+            m[3] + m[0], m[3] - m[0],
+            m[3] + m[1], m[3] - m[1],
+            m[3] + m[2], m[3] - m[2]])
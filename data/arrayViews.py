@@ -11,6 +11,8 @@
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 from functools import partial
+from ctypes import c_void_p, create_string_buffer
+import numpy
 from numpy import array
 from ..raw import gl
 
@@ -44,12 +46,97 @@ arrayFormatInfo = {
     'color_index': (gl.GL_INDEX_ARRAY, 'glIndex', True, 'Bhlifd', 1),
     'fog_coord': (gl.GL_FOG_COORD_ARRAY, 'glFogCoord', True, 'fd', 1),
     'edge_flag': (gl.GL_EDGE_FLAG_ARRAY, 'glEdgeFlag', True, 'B', 1),
+    'vertex_attrib': (None, 'glVertexAttrib', True, 'BHIbhifd', [1,2,3,4]),
+    }
+
+# gl*Pointer functions that take no size, or neither size nor type
+_pointerArgsByKind = {
+    'normal': 'type',
+    'color_index': 'type',
+    'fog_coord': 'type',
+    'edge_flag': 'stride',
+    }
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+interleavedFieldKinds = {
+    'v': 'vertex', 'pos': 'vertex', 'position': 'vertex', 'vertex': 'vertex', 
+    't': 'texture_coord', 'uv': 'texture_coord', 'tex': 'texture_coord', 'texcoord': 'texture_coord', 'texture_coord': 'texture_coord',
+    'n': 'normal', 'normal': 'normal', 
+    'c': 'color', 'color': 'color', 
+    'color2': 'secondary_color', 'secondary_color': 'secondary_color', 
+    'fog': 'fog_coord', 'fog_coord': 'fog_coord',
+    'edge': 'edge_flag', 'edge_flag': 'edge_flag',
+    }
+
+# packed field layouts, in memory order, that glInterleavedArrays accepts
+interleavedFormats = {
+    (('vertex', 2, 'f'),): gl.GL_V2F,
+    (('vertex', 3, 'f'),): gl.GL_V3F,
+    (('color', 4, 'B'), ('vertex', 2, 'f')): gl.GL_C4UB_V2F,
+    (('color', 4, 'B'), ('vertex', 3, 'f')): gl.GL_C4UB_V3F,
+    (('color', 3, 'f'), ('vertex', 3, 'f')): gl.GL_C3F_V3F,
+    (('normal', 3, 'f'), ('vertex', 3, 'f')): gl.GL_N3F_V3F,
+    (('color', 4, 'f'), ('normal', 3, 'f'), ('vertex', 3, 'f')): gl.GL_C4F_N3F_V3F,
+    (('texture_coord', 2, 'f'), ('vertex', 3, 'f')): gl.GL_T2F_V3F,
+    (('texture_coord', 4, 'f'), ('vertex', 4, 'f')): gl.GL_T4F_V4F,
+    (('texture_coord', 2, 'f'), ('color', 4, 'B'), ('vertex', 3, 'f')): gl.GL_T2F_C4UB_V3F,
+    (('texture_coord', 2, 'f'), ('color', 3, 'f'), ('vertex', 3, 'f')): gl.GL_T2F_C3F_V3F,
+    (('texture_coord', 2, 'f'), ('normal', 3, 'f'), ('vertex', 3, 'f')): gl.GL_T2F_N3F_V3F,
+    (('texture_coord', 2, 'f'), ('color', 4, 'f'), ('normal', 3, 'f'), ('vertex', 3, 'f')): gl.GL_T2F_C4F_N3F_V3F,
+    (('texture_coord', 4, 'f'), ('color', 4, 'f'), ('normal', 3, 'f'), ('vertex', 4, 'f')): gl.GL_T4F_C4F_N3F_V4F,
     }
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Definitions 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+def _glCallAll(calls):
+    """Returns one callable issuing calls in order.  Nested call sequences
+    are flattened so replaying never recurses."""
+    flat = []
+    for call in calls:
+        flat.extend(getattr(call, 'calls', None) or [call])
+    flat = tuple(flat)
+
+    def glCallAll():
+        for call in flat:
+            call()
+    glCallAll.calls = flat
+    return glCallAll
+
+# generic attribute locations, keyed on (program id, attribute name)
+_attribLocationCache = {}
+
+def _programId(program):
+    program = getattr(program, '_as_parameter_', program)
+    return getattr(program, 'value', program)
+
+def attribLocation(program, name, gl=gl):
+    """Cached glGetAttribLocation; -1 if name is not an active attribute"""
+    key = (_programId(program), name)
+    loc = _attribLocationCache.get(key)
+    if loc is None:
+        loc = gl.glGetAttribLocation(key[0], create_string_buffer(name))
+        _attribLocationCache[key] = loc
+    return loc
+
+def invalidateAttribLocations(program=None):
+    """Forgets cached locations of program, or of all programs; call
+    after relinking"""
+    if program is None:
+        _attribLocationCache.clear()
+        return
+    pid = _programId(program)
+    for key in _attribLocationCache.keys():
+        if key[0] == pid:
+            del _attribLocationCache[key]
+
+# prepared (send, enable, disable) calls of client array binds, keyed on
+# the view class, kind and the array's address and layout
+_bindCache = {}
+bindCacheSize = 4096
+
 _arrayViewRegistry = {}
 def _registerArrayView(klass):
     klass._configClass()
@@ -88,17 +175,35 @@ class ArrayView(object):
         return klassOrSelf
     _configClass = classmethod(config)
 
+    data = None
+    buffer = None
+    bufferOffset = 0
+    _bindKey = None
+
+    def _bindKeyFor(self, arr, gl):
+        return (self.__class__, self.kind, arr.ctypes.data, arr.dtype.str, arr.shape, arr.strides, gl)
+
     def bind(self, arr, gl=gl):
         arr = array(arr, copy=False, subok=1)
+        self.data = arr
+
+        if len(arr.strides) >= 2:
+            key = self._bindKeyFor(arr, gl)
+            entry = _bindCache.get(key)
+            if entry is None:
+                if len(_bindCache) >= bindCacheSize:
+                    _bindCache.clear()
+                entry = self._glPointerCalls(arr, c_void_p(arr.ctypes.data), gl)
+                _bindCache[key] = entry
+            self._glsend, self._glenable, self._gldisable = entry
+            self._bindKey = key
+            return
+
+        self._bindKey = None
         glid_type, glc_fmt = _dtype_gltype_map[arr.dtype.char]
         glc_dim = arr.shape[-1]
 
-        if len(arr.strides) >= 2:
-            glgroup_raw = getattr(gl, self.glfn_group)
-            self._glsend = partial(glgroup_raw, glc_dim, glid_type, arr.strides[-2], arr.ctypes)
-            self._glenable = partial(gl.glEnableClientState, self.glid_kind)
-            self._gldisable = partial(gl.glDisableClientState, self.glid_kind)
-        elif glc_dim == 0: 
+        if glc_dim == 0: 
             self._glsend = self._glNoOP
             self._glenable = self._glNoOP
             self._gldisable = self._glNoOP
@@ -108,6 +213,56 @@ class ArrayView(object):
             self._glenable = self._glNoOP
             self._gldisable = self._glNoOP
 
+    def rebindIfChanged(self, arr, gl=gl):
+        """Binds arr unless it has the address and layout of the currently
+        bound array.  The same array object is checked too, since an
+        in-place resize moves its data.  Returns True if the calls were
+        rebuilt."""
+        arr = array(arr, copy=False, subok=1)
+        if self._bindKey is not None and self._bindKey == self._bindKeyFor(arr, gl):
+            self.data = arr
+            return False
+        self.bind(arr, gl)
+        return True
+    rebind_if_changed = rebindIfChanged
+
+    def _glPointerCalls(self, arr, ptr, gl):
+        glid_type = _dtype_gltype_map[arr.dtype.char][0]
+        glsend = self._glPointer(gl, arr.shape[-1], glid_type, arr.strides[-2], ptr)
+        glenable = partial(gl.glEnableClientState, self.glid_kind)
+        gldisable = partial(gl.glDisableClientState, self.glid_kind)
+        return glsend, glenable, gldisable
+
+    def bindBuffer(self, buffer, offset=0, dtype='f', shape=None, stride=0, gl=gl):
+        """Binds to data already in the GPU memory of buffer, an
+        ArrayBuffer, starting offset bytes in.  dtype and shape describe the
+        data as bind's arr would, e.g. dtype='f', shape=(count, 3)"""
+        glid_type = _dtype_gltype_map[numpy.dtype(dtype).char][0]
+        if shape is not None and len(shape) >= 2:
+            glc_dim = shape[-1]
+        else: glc_dim = 1
+
+        self.data = None
+        self._bindKey = None
+        self.buffer = buffer
+        self.bufferOffset = offset
+        self.shape = shape
+
+        glpointer = self._glPointer(gl, glc_dim, glid_type, stride, c_void_p(offset))
+        self._glsend = self._glCallAll([buffer.bind, glpointer, buffer.unbind])
+        self._glenable = partial(gl.glEnableClientState, self.glid_kind)
+        self._gldisable = partial(gl.glDisableClientState, self.glid_kind)
+
+    def _glPointer(self, gl, glc_dim, glid_type, stride, ptr, kind=None, glfn_group=None):
+        glgroup_raw = getattr(gl, glfn_group or self.glfn_group)
+        pointerArgs = _pointerArgsByKind.get(kind or self.kind)
+        if pointerArgs == 'type':
+            return partial(glgroup_raw, glid_type, stride, ptr)
+        elif pointerArgs == 'stride':
+            return partial(glgroup_raw, stride, ptr)
+        else:
+            return partial(glgroup_raw, glc_dim, glid_type, stride, ptr)
+
     def enable(self): 
         self._glenable()
     def disable(self): 
@@ -120,6 +275,8 @@ class ArrayView(object):
     _gldisable = _glNoOP
     _glsend = _glNoOP
 
+    _glCallAll = staticmethod(_glCallAll)
+
 _registerArrayView(ArrayView)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -160,6 +317,184 @@ class EdgeFlagArrayView(ArrayView):
     kind = 'edge_flag'
 _registerArrayView(EdgeFlagArrayView)
 
+class VertexAttribArrayView(ArrayView):
+    """Generic shader attribute array, sent with glVertexAttribPointer to
+    location.  Set location directly or look it up with locate.  With
+    normalized, integer data is mapped to [0,1] or [-1,1]."""
+    kind = 'vertex_attrib'
+    location = None
+    normalized = False
+
+    def locate(self, program, name, gl=gl):
+        self.location = attribLocation(program, name, gl)
+        return self.location
+
+    def bind(self, arr, location=None, normalized=None, gl=gl):
+        if location is not None:
+            self.location = location
+        if normalized is not None:
+            self.normalized = normalized
+        if self.location is None:
+            raise ValueError("No attribute location set for %r" % (self,))
+
+        arr = array(arr, copy=False, subok=1)
+        if self.location < 0:
+            # attribute is not active in the program
+            self.data = arr
+            self._bindKey = None
+            self._glsend = self._glNoOP
+            self._glenable = self._glNoOP
+            self._gldisable = self._glNoOP
+            return
+
+        if len(arr.strides) >= 2:
+            return ArrayView.bind(self, arr, gl)
+
+        self.data = arr
+        self._bindKey = None
+        value = arr.astype('f')
+        if self.normalized and arr.dtype.kind in 'ui':
+            value /= numpy.iinfo(arr.dtype).max
+        self._constValue = value
+        glsingle_raw = getattr(gl, 'glVertexAttrib%dfv' % (value.shape[-1],))
+        self._glsend = partial(glsingle_raw, self.location, value.ctypes)
+        self._glenable = self._glNoOP
+        self._gldisable = self._glNoOP
+
+    def rebindIfChanged(self, arr, gl=gl):
+        if self.location is None or self.location < 0:
+            return self.bind(arr, gl=gl)
+        return ArrayView.rebindIfChanged(self, arr, gl)
+    rebind_if_changed = rebindIfChanged
+
+    def _bindKeyFor(self, arr, gl):
+        return ArrayView._bindKeyFor(self, arr, gl) + (self.location, bool(self.normalized))
+
+    def _glPointerCalls(self, arr, ptr, gl):
+        glid_type = _dtype_gltype_map[arr.dtype.char][0]
+        return self._glAttribCalls(arr.shape[-1], glid_type, arr.strides[-2], ptr, gl)
+
+    def _glAttribCalls(self, glc_dim, glid_type, stride, ptr, gl):
+        loc = self.location
+        glsend = partial(gl.glVertexAttribPointer, loc, glc_dim, glid_type, bool(self.normalized), stride, ptr)
+        glenable = partial(gl.glEnableVertexAttribArray, loc)
+        gldisable = partial(gl.glDisableVertexAttribArray, loc)
+        return glsend, glenable, gldisable
+
+    def bindBuffer(self, buffer, offset=0, dtype='f', shape=None, stride=0, location=None, normalized=None, gl=gl):
+        if location is not None:
+            self.location = location
+        if normalized is not None:
+            self.normalized = normalized
+        if self.location is None:
+            raise ValueError("No attribute location set for %r" % (self,))
+
+        glid_type = _dtype_gltype_map[numpy.dtype(dtype).char][0]
+        if shape is not None and len(shape) >= 2:
+            glc_dim = shape[-1]
+        else: glc_dim = 1
+
+        self.data = None
+        self._bindKey = None
+        self.buffer = buffer
+        self.bufferOffset = offset
+        self.shape = shape
+
+        glpointer, self._glenable, self._gldisable = self._glAttribCalls(glc_dim, glid_type, stride, c_void_p(offset), gl)
+        self._glsend = self._glCallAll([buffer.bind, glpointer, buffer.unbind])
+
+_registerArrayView(VertexAttribArrayView)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class InterleavedArrayView(ArrayView):
+    """Binds every field of a numpy record array from the one buffer.  Field
+    names map to array kinds through fieldKinds, e.g. a dtype of
+    [('uv', 'f', 2), ('color', 'B', 4), ('pos', 'f', 3)].  Layouts matching a
+    standard interleaved format are set up with a single glInterleavedArrays
+    call; others use one gl*Pointer call per field."""
+
+    kind = 'interleaved'
+    fieldKinds = interleavedFieldKinds
+    interleavedFormats = interleavedFormats
+
+    def config(klassOrSelf, kind=None):
+        return klassOrSelf
+    _configClass = classmethod(config)
+
+    def bind(self, arr, gl=gl):
+        arr = array(arr, copy=False, subok=1)
+        self.data = arr
+        fields = self.fieldLayout(arr.dtype)
+        if arr.ndim:
+            stride = arr.strides[0]
+        else: stride = arr.itemsize
+        self._bindFields(fields, stride, arr.ctypes.data, gl)
+
+    def _bindFields(self, fields, stride, ptr, gl=gl):
+        self.glid_kinds = [self.arrayFormatInfo[kind][0] for kind, dim, fmt, offset in fields]
+        glformat = self.interleavedFormatFor(fields)
+        if glformat is not None:
+            # glInterleavedArrays enables the arrays it sets
+            self._glsend = partial(gl.glInterleavedArrays, glformat, stride, ptr)
+            self._glenable = self._glNoOP
+        else:
+            self._glsend = self._glCallAll([
+                self._glPointer(gl, dim, _dtype_gltype_map[fmt][0], stride, ptr + offset, 
+                    kind, self.arrayFormatInfo[kind][1]+'Pointer')
+                for kind, dim, fmt, offset in fields])
+            self._glenable = self._glCallAll([
+                partial(gl.glEnableClientState, glid_kind) for glid_kind in self.glid_kinds])
+
+        self._gldisable = self._glCallAll([
+            partial(gl.glDisableClientState, glid_kind) for glid_kind in self.glid_kinds])
+        self.glformat = glformat
+
+    def bindBuffer(self, buffer, offset=0, dtype=None, shape=None, stride=None, gl=gl):
+        """Binds the record layout of dtype to data already in the GPU memory
+        of buffer, starting offset bytes in"""
+        dtype = numpy.dtype(dtype)
+        if stride is None:
+            stride = dtype.itemsize
+
+        self.data = None
+        self.buffer = buffer
+        self.bufferOffset = offset
+        self.shape = shape
+        self._bindFields(self.fieldLayout(dtype), stride, offset, gl)
+        send = self._glsend
+        self._glsend = self._glCallAll([buffer.bind, send, buffer.unbind])
+
+    def fieldLayout(self, dtype):
+        """Returns [(kind, dim, dtype char, byte offset)] in memory order"""
+        fields = []
+        for name in dtype.names or ():
+            kind = self.fieldKinds.get(name)
+            if kind is None:
+                # not vertex data, e.g. an application id field
+                continue
+
+            fdtype, offset = dtype.fields[name][:2]
+            dim = 1
+            for e in fdtype.shape:
+                dim *= e
+            fields.append((kind, dim, fdtype.base.char, offset))
+
+        fields.sort(key=lambda f: f[-1])
+        return fields
+
+    def interleavedFormatFor(self, fields):
+        offset = 0
+        for kind, dim, fmt, fieldOffset in fields:
+            if fieldOffset != offset:
+                return None
+            offset += dim * numpy.dtype(fmt).itemsize
+
+        layout = tuple(field[:3] for field in fields)
+        return self.interleavedFormats.get(layout)
+
+_registerArrayView(InterleavedArrayView)
+
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Add in draw array views
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
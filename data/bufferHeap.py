@@ -0,0 +1,258 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import numpy
+
+from .bufferObjects import ArrayBuffer
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _orderFor(nbytes):
+    order = 0
+    while (1 << order) < nbytes:
+        order += 1
+    return order
+
+class BuddyAllocator(object):
+    """Binary buddy allocator over a range of size bytes, in blocks of
+    minBlock bytes or larger powers of two.  Needs no GL."""
+
+    def __init__(self, size, minBlock=256):
+        self.minOrder = _orderFor(minBlock)
+        self.maxOrder = _orderFor(size)
+        if (1 << self.maxOrder) != size or self.maxOrder < self.minOrder:
+            raise ValueError("Size must be a power of two no smaller than minBlock")
+        self.size = size
+        self.freeLists = dict((o, set()) for o in xrange(self.minOrder, self.maxOrder+1))
+        self.freeLists[self.maxOrder].add(0)
+        self.allocated = {}
+
+    def alloc(self, nbytes):
+        """Returns the offset of a block holding nbytes, or None if full"""
+        order = max(self.minOrder, _orderFor(nbytes))
+        found = order
+        while found <= self.maxOrder and not self.freeLists[found]:
+            found += 1
+        if found > self.maxOrder:
+            return None
+
+        freeList = self.freeLists[found]
+        offset = min(freeList)
+        freeList.remove(offset)
+        while found > order:
+            found -= 1
+            self.freeLists[found].add(offset + (1 << found))
+
+        self.allocated[offset] = (order, nbytes)
+        return offset
+
+    def free(self, offset):
+        order, nbytes = self.allocated.pop(offset)
+        while order < self.maxOrder:
+            buddy = offset ^ (1 << order)
+            freeList = self.freeLists[order]
+            if buddy not in freeList:
+                break
+            freeList.remove(buddy)
+            offset = min(offset, buddy)
+            order += 1
+        self.freeLists[order].add(offset)
+
+    def blockSize(self, offset):
+        return 1 << self.allocated[offset][0]
+
+    def isEmpty(self):
+        return not self.allocated
+
+    def getStats(self):
+        used = sum(1 << order for order, n in self.allocated.itervalues())
+        requested = sum(n for order, n in self.allocated.itervalues())
+        largestFree = 0
+        for order, freeList in self.freeLists.iteritems():
+            if freeList:
+                largestFree = max(largestFree, 1 << order)
+        return dict(size=self.size, used=used, requested=requested,
+            free=self.size - used, largestFree=largestFree,
+            blocks=len(self.allocated))
+    stats = property(getStats)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class HeapHandle(object):
+    """A sub-allocation of a BufferHeap.  buffer and offset change when the
+    heap is defragmented; onMove, if set, is then called with the handle."""
+
+    onMove = None
+
+    def __init__(self, heap, arena, offset, size):
+        self.heap = heap
+        self.arena = arena
+        self.offset = offset
+        self.size = size
+
+    def __repr__(self):
+        return '<%s offset:%d size:%d>' % (self.__class__.__name__, self.offset, self.size)
+
+    def getBuffer(self):
+        if self.arena is not None:
+            return self.arena.buffer
+    buffer = property(getBuffer)
+
+    def isLive(self):
+        return self.arena is not None
+
+    def sendData(self, data):
+        data = numpy.ascontiguousarray(data)
+        if data.nbytes > self.size:
+            raise ValueError("Data of %d bytes does not fit a %d byte handle" % (data.nbytes, self.size))
+        buffer = self.buffer
+        buffer.bind()
+        buffer.sendDataAt(data, self.offset)
+        buffer.unbind()
+
+    def bindView(self, view, dtype='f', shape=None, stride=0):
+        view.bindBuffer(self.buffer, self.offset, dtype, shape, stride)
+        return view
+
+    def free(self):
+        self.heap.free(self)
+
+class HeapArena(object):
+    def __init__(self, buffer, size, minBlock):
+        self.buffer = buffer
+        self.allocator = BuddyAllocator(size, minBlock)
+        self.handles = {}
+
+class BufferHeap(object):
+    """Packs many small allocations into a few large GL buffers.
+
+    Arenas of arenaSize bytes are created with bufferFactory as needed and
+    carved up by a buddy allocator.  defragment repacks live handles into
+    as few arenas as possible, copying their contents through
+    getDataAt/sendDataAt, and rewrites the handles."""
+
+    BuddyAllocator = BuddyAllocator
+    HeapHandle = HeapHandle
+    arenaSize = 4 << 20
+    minBlock = 256
+
+    def __init__(self, arenaSize=None, minBlock=None, bufferFactory=ArrayBuffer):
+        if arenaSize is not None:
+            self.arenaSize = arenaSize
+        if minBlock is not None:
+            self.minBlock = minBlock
+        self.bufferFactory = bufferFactory
+        self.arenas = []
+
+    def _newArena(self, nbytes=0):
+        size = self.arenaSize
+        while size < nbytes:
+            size *= 2
+        buffer = self.bufferFactory()
+        buffer.bind()
+        buffer.allocate(size)
+        buffer.unbind()
+        arena = HeapArena(buffer, size, self.minBlock)
+        self.arenas.append(arena)
+        return arena
+
+    def _allocIn(self, arenas, nbytes):
+        for arena in arenas:
+            offset = arena.allocator.alloc(nbytes)
+            if offset is not None:
+                return arena, offset
+        return None, None
+
+    def alloc(self, nbytes):
+        arena, offset = self._allocIn(self.arenas, nbytes)
+        if arena is None:
+            arena = self._newArena(nbytes)
+            offset = arena.allocator.alloc(nbytes)
+        handle = self.HeapHandle(self, arena, offset, nbytes)
+        arena.handles[offset] = handle
+        return handle
+
+    def write(self, data):
+        """Allocates space for data and uploads it; returns the handle"""
+        data = numpy.ascontiguousarray(data)
+        handle = self.alloc(data.nbytes)
+        handle.sendData(data)
+        return handle
+
+    def free(self, handle):
+        arena = handle.arena
+        if arena is None:
+            return
+        del arena.handles[handle.offset]
+        arena.allocator.free(handle.offset)
+        handle.arena = None
+
+    def release(self):
+        for arena in self.arenas:
+            for handle in arena.handles.values():
+                handle.arena = None
+            arena.buffer.release()
+        self.arenas = []
+
+    def _copyRange(self, src, srcOffset, dst, dstOffset, nbytes):
+        src.bind()
+        data = src.getDataAt(srcOffset, nbytes)
+        src.unbind()
+        dst.bind()
+        dst.sendDataAt(data, dstOffset)
+        dst.unbind()
+
+    def defragment(self):
+        """Repacks every live handle, largest first, into fresh arenas and
+        releases the old ones.  Returns the number of handles moved."""
+        oldArenas = self.arenas
+        handles = [h for arena in oldArenas for h in arena.handles.itervalues()]
+        handles.sort(key=lambda h: h.size, reverse=True)
+
+        self.arenas = []
+        moved = []
+        for handle in handles:
+            arena, offset = self._allocIn(self.arenas, handle.size)
+            if arena is None:
+                arena = self._newArena(handle.size)
+                offset = arena.allocator.alloc(handle.size)
+            self._copyRange(handle.arena.buffer, handle.offset, arena.buffer, offset, handle.size)
+            handle.arena = arena
+            handle.offset = offset
+            arena.handles[offset] = handle
+            moved.append(handle)
+
+        for arena in oldArenas:
+            arena.buffer.release()
+
+        for handle in moved:
+            if handle.onMove is not None:
+                handle.onMove(handle)
+        return len(moved)
+
+    def getStats(self):
+        """Totals over all arenas.  fragmentation is the share of free space
+        outside the largest free block of each arena; internalWaste is the
+        block rounding overhead."""
+        totals = dict(arenas=len(self.arenas), size=0, used=0, requested=0, free=0, blocks=0)
+        outsideLargest = 0
+        for arena in self.arenas:
+            stats = arena.allocator.getStats()
+            for key in ('size', 'used', 'requested', 'free', 'blocks'):
+                totals[key] += stats[key]
+            outsideLargest += stats['free'] - stats['largestFree']
+        totals['fragmentation'] = outsideLargest / float(max(totals['free'], 1))
+        totals['internalWaste'] = totals['used'] - totals['requested']
+        return totals
+    stats = property(getStats)
@@ -10,11 +10,14 @@
 #~ Imports 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-from ctypes import pythonapi, cast, byref, c_void_p
+from ctypes import cast, byref, c_void_p, c_ubyte
 
 import numpy
 
-from TG.ext.openGL.raw import gl
+from TG.ext.openGL import hasGLExtension
+from TG.ext.openGL.raw import gl, glext
+from TG.ext.openGL.data.namePools import sizeClass
+from TG.ext.openGL.data.memoryRegistry import memoryRegistry
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Constants / Variiables / Etc. 
@@ -61,6 +64,12 @@ accessMap = {
     'read_write': gl.GL_READ_WRITE,
     }
 
+mapRangeAccessMap = {
+    gl.GL_READ_ONLY: glext.GL_MAP_READ_BIT,
+    gl.GL_WRITE_ONLY: glext.GL_MAP_WRITE_BIT,
+    gl.GL_READ_WRITE: glext.GL_MAP_READ_BIT | glext.GL_MAP_WRITE_BIT,
+    }
+
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Definitions 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -68,12 +77,116 @@ accessMap = {
 class GLBufferException(Exception):
     pass
 
+class MappedRange(object):
+    """A mapped byte range of a bound buffer object, used as a context
+    manager yielding a zero-copy numpy view of the range.  The range is
+    unmapped on exit.
+
+    With explicitFlush, only the spans passed to flush are guaranteed to
+    reach the buffer.  unsynchronized skips waiting for pending draws that
+    use the buffer.  invalidate may be 'range' or 'buffer' to discard the
+    previous contents."""
+
+    array = None
+
+    def __init__(self, buffer, offset, length, access, dtype, shape, invalidate, unsynchronized, explicitFlush):
+        self.buffer = buffer
+        self.target = buffer.target
+        self.offset = offset
+        self.length = length
+        self.access = access
+        self.dtype = dtype
+        self.shape = shape
+        self.invalidate = invalidate
+        self.unsynchronized = unsynchronized
+        self.explicitFlush = explicitFlush
+
+    def __enter__(self):
+        return self.map()
+    def __exit__(self, excType, exc, tb):
+        self.unmap()
+
+    def map(self):
+        if hasGLExtension('GL_ARB_map_buffer_range'):
+            self._api = 'arb'
+            ptr = self._mapARB()
+        elif hasGLExtension('GL_APPLE_flush_buffer_range'):
+            self._api = 'apple'
+            ptr = self._mapApple()
+        else:
+            self._api = None
+            ptr = self._mapWhole()
+        if not ptr:
+            raise GLBufferException("Unable to map buffer range %d:%d" % (self.offset, self.offset+self.length))
+
+        raw = (c_ubyte * self.length).from_address(ptr)
+        result = numpy.frombuffer(raw, self.dtype)
+        if self.shape is not None:
+            result = result.reshape(self.shape)
+        self.array = result
+        return result
+
+    def _mapARB(self):
+        flags = mapRangeAccessMap[self.access]
+        if self.invalidate == 'buffer':
+            flags |= glext.GL_MAP_INVALIDATE_BUFFER_BIT
+        elif self.invalidate:
+            flags |= glext.GL_MAP_INVALIDATE_RANGE_BIT
+        if self.unsynchronized:
+            flags |= glext.GL_MAP_UNSYNCHRONIZED_BIT
+        if self.explicitFlush:
+            flags |= glext.GL_MAP_FLUSH_EXPLICIT_BIT
+        return glext.glMapBufferRange(self.target, self.offset, self.length, flags)
+
+    def _mapApple(self):
+        target = self.target
+        if self.unsynchronized:
+            glext.glBufferParameteriAPPLE(target, glext.GL_BUFFER_SERIALIZED_MODIFY_APPLE, gl.GL_FALSE)
+        if self.explicitFlush:
+            glext.glBufferParameteriAPPLE(target, glext.GL_BUFFER_FLUSHING_UNMAP_APPLE, gl.GL_FALSE)
+        return self._mapWhole()
+
+    def _mapWhole(self):
+        if self.invalidate == 'buffer':
+            # orphan the storage; only the whole buffer can be discarded
+            gl.glBufferData(self.target, self.buffer.nbytes, None, self.buffer.usage)
+            self.buffer._storageKey = None
+        ptr = gl.glMapBuffer(self.target, self.access)
+        if ptr:
+            ptr += self.offset
+        return ptr
+
+    def flush(self, start=0, stop=None):
+        """Flushes bytes [start, stop) of the mapped range"""
+        if stop is None:
+            stop = self.length
+        if not self.explicitFlush or stop <= start:
+            return
+        if self._api == 'arb':
+            glext.glFlushMappedBufferRange(self.target, start, stop - start)
+        elif self._api == 'apple':
+            glext.glFlushMappedBufferRangeAPPLE(self.target, self.offset + start, stop - start)
+
+    def unmap(self):
+        if self.array is None:
+            return
+        self.array = None
+        gl.glUnmapBuffer(self.target)
+        if self._api == 'apple':
+            if self.unsynchronized:
+                glext.glBufferParameteriAPPLE(self.target, glext.GL_BUFFER_SERIALIZED_MODIFY_APPLE, gl.GL_TRUE)
+            if self.explicitFlush:
+                glext.glBufferParameteriAPPLE(self.target, glext.GL_BUFFER_FLUSHING_UNMAP_APPLE, gl.GL_TRUE)
+
 class BufferBase(object):
     _as_parameter_ = None # GLenum returned from glGenBuffers
     target = None
     nbytes = 0
     dtype = numpy.ubyte
     accessByName = accessMap
+    namePool = None # NamePool to recycle names and storage through; see namePools
+    _storageKey = None
+    owner = None # tag reported by memoryRegistry
 
     def __init__(self, usage=None, **kw):
         self.create(usage)
@@ -109,26 +222,67 @@ class BufferBase(object):
 
     def _genId(self):
         if self._as_parameter_ is None:
+            pool = self.namePool
+            if pool is not None:
+                name, self._storageKey = pool.acquire()
+                self._as_parameter_ = gl.GLenum(name)
+                return
+
             p = gl.GLenum(0)
             gl.glGenBuffers(1, byref(p))
             self._as_parameter_ = p
     def _delId(self):
         p = self._as_parameter_
         if p is not None:
-            gl.glDeleteBuffers(1, byref(p))
+            pool = self.namePool
+            if pool is not None:
+                pool.recycle(p.value, self._storageKey)
+            else:
+                gl.glDeleteBuffers(1, byref(p))
             self._as_parameter_ = None
+            self._storageKey = None
+            memoryRegistry.untrack(self)
+
+    def _pooledStorage(self, nbytes, usage):
+        """Gives the bound buffer storage of nbytes' size class, adopting a
+        pooled name that already has it when one is idle.  Returns True if
+        existing storage was reused."""
+        key = (self.target, sizeClass(nbytes), usage)
+        if key == self._storageKey:
+            return True
+
+        pool = self.namePool
+        name, storageKey = pool.acquire(key, exact=True)
+        if name is not None:
+            pool.recycle(self._as_parameter_.value, self._storageKey)
+            self._as_parameter_ = gl.GLenum(name)
+            self._storageKey = storageKey
+            self.bind()
+            return True
+
+        gl.glBufferData(self.target, key[1], None, usage)
+        self._storageKey = key
+        return False
 
     def bind(self):
         gl.glBindBuffer(self.target, self)
+        memoryRegistry.touch(self)
     def unbind(self):
         gl.glBindBuffer(self.target, 0)
 
     def sendData(self, data, usage=None):
+        if isinstance(data, numpy.memmap) or not isinstance(data, numpy.ndarray):
+            return self.sendDataChunked(data, usage)
         if usage is not None:
             usage = self.usageByName[usage]
         else: usage = self.usage
-        gl.glBufferData(self.target, data.nbytes, data.ctypes, usage)
+        if self.namePool is not None:
+            self._pooledStorage(data.nbytes, usage)
+            gl.glBufferSubData(self.target, 0, data.nbytes, data.ctypes)
+        else:
+            gl.glBufferData(self.target, data.nbytes, data.ctypes, usage)
         self.nbytes = data.nbytes
+        self._trackMemory(usage)
         return (0, self.nbytes)
 
     def allocate(self, count, usage=None, dtype=None):
@@ -138,18 +292,58 @@ class BufferBase(object):
         if dtype is None:
             dtype = self.dtype
         nbytes = count*dtype().itemsize
-        gl.glBufferData(self.target, nbytes, None, usage)
+        if self.namePool is not None:
+            self._pooledStorage(nbytes, usage)
+        else:
+            gl.glBufferData(self.target, nbytes, None, usage)
         self.nbytes = nbytes
+        self._trackMemory(usage)
         return (0, nbytes)
 
+    def _trackMemory(self, usage):
+        storageKey = self._storageKey
+        if storageKey is not None:
+            nbytes = storageKey[1]
+        else: nbytes = self.nbytes
+        memoryRegistry.track(self, 'buffer', nbytes, usage, self.owner or self.__class__.__name__)
+
     def sendDataAt(self, data, offset=0):
         gl.glBufferSubData(self.target, offset, data.nbytes, data.ctypes)
         return (offset, offset + data.nbytes)
 
-    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    chunkBytes = 4 << 20
+    def sendDataChunked(self, data, usage=None, chunkBytes=None, progress=None):
+        """Allocates storage for data, then sends it about chunkBytes at a
+        time, so file backed data such as numpy.memmap or mmap never needs
+        to be wholly resident.  progress, if given, is called with
+        (sentBytes, totalBytes) after each chunk."""
+        if not isinstance(data, numpy.ndarray):
+            data = numpy.frombuffer(data, numpy.ubyte)
+        if data.ndim == 0:
+            data = data.reshape(1)
+        total = data.nbytes
+        self.allocate(total, usage, numpy.ubyte)
+
+        # chunk along whole rows, so non-contiguous data is copied a piece at a time
+        rowBytes = max(1, total // max(len(data), 1))
+        rows = max(1, (chunkBytes or self.chunkBytes) // rowBytes)
+        offset = 0
+        for start in xrange(0, len(data), rows):
+            chunk = numpy.ascontiguousarray(data[start:start+rows])
+            self.sendDataAt(chunk, offset)
+            offset += chunk.nbytes
+            if progress is not None:
+                progress(offset, total)
+        return (0, total)
+
+    def getDataAt(self, offset, nbytes, dtype=None):
+        result = numpy.empty(nbytes, numpy.ubyte)
+        gl.glGetBufferSubData(self.target, offset, nbytes, result.ctypes)
+        if dtype is not None:
+            result = result.view(dtype)
+        return result
 
-    _bufferFromMemory = staticmethod(pythonapi.PyBuffer_FromMemory)
-    _bufferFromReadWriteMemory = staticmethod(pythonapi.PyBuffer_FromReadWriteMemory)
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
     _mapBuffer = None
     def map(self, access, dtype=None):
@@ -157,17 +351,18 @@ class BufferBase(object):
         result = self._mapBuffer
         if result is None:
             ptr = gl.glMapBuffer(self.target, access)
+            if not ptr:
+                raise GLBufferException("Unable to map buffer")
 
+            raw = (c_ubyte * self.nbytes).from_address(ptr)
+            result = numpy.frombuffer(raw, dtype or self.dtype)
             if access == gl.GL_READ_ONLY:
-                buf = self._bufferFromMemory(ptr, self.nbytes)
-            else:
-                buf = self._bufferFromReadWriteMemory(ptr, self.nbytes)
-
-            result = numpy.frombuffer(buf, dtype or self.dtype)
+                result.flags.writeable = False
 
             self._mapBuffer = result
             self._map_count = 1
             self._map_access = access
+            return result
 
         else:
             if self._map_access not in (access, gl.GL_READ_WRITE,):
@@ -180,11 +375,22 @@ class BufferBase(object):
             else:
                 return result.view(dtype)
 
+    def mapRange(self, offset=0, length=None, access='w', dtype=None, shape=None, invalidate=False, unsynchronized=False, explicitFlush=False):
+        """Maps length bytes from offset of the bound buffer; use as
+        ``with buf.mapRange(...) as arr:``.  See MappedRange."""
+        if length is None:
+            length = self.nbytes - offset
+        dtype = numpy.dtype(dtype or self.dtype)
+        if length % dtype.itemsize:
+            raise GLBufferException("Range of %d bytes is not a multiple of %r" % (length, dtype))
+        return MappedRange(self, offset, length, self.accessByName[access], dtype, shape, invalidate, unsynchronized, explicitFlush)
+
     def unmap(self):
         self._map_count -= 1
         if self._map_count <= 0:
             gl.glUnmapBuffer(self.target)
             self._map_count = 0
+            self._mapBuffer = None
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -200,7 +406,127 @@ class ElementArrayBuffer(BufferBase):
     def isGLElementBuffer(self):
         return True
 
+class PixelPackBuffer(BufferBase):
+    target = glext.GL_PIXEL_PACK_BUFFER_ARB
+    _usage = bufferUsageMap['streamRead']
+
+    def isGLPixelPackBuffer(self):
+        return True
+
+class PixelUnpackBuffer(BufferBase):
+    target = glext.GL_PIXEL_UNPACK_BUFFER_ARB
+    _usage = bufferUsageMap['streamDraw']
+
+    def isGLPixelUnpackBuffer(self):
+        return True
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class StreamingRingBuffer(ArrayBuffer):
+    """One large stream buffer that per-frame dynamic data is appended to
+    with glBufferSubData.  When a write does not fit in the space left,
+    the storage is orphaned with glBufferData(None) and writing restarts at
+    the front, so the driver never waits on draws still reading the old
+    storage.
+
+    write returns (buffer, offset) for ArrayView.bindBuffer; writeView does
+    that binding directly."""
+
+    _usage = bufferUsageMap['streamDraw']
+    namePool = None # orphaning must really respecify the storage
+    capacity = 4 << 20
+    alignment = 16
+
+    def __init__(self, capacity=None, usage=None, target=None, **kw):
+        # create() binds to target, so it must be set first
+        if target is not None:
+            self.target = target
+        ArrayBuffer.__init__(self, usage, **kw)
+        if capacity is not None:
+            self.capacity = capacity
+        self.allocate(self.capacity)
+        self.head = 0
+        self.resetStats()
+
+    def allocate(self, count, usage=None, dtype=None):
+        result = ArrayBuffer.allocate(self, count, usage, dtype)
+        self.capacity = self.nbytes
+        return result
+
+    def orphan(self):
+        self.allocate(self.capacity)
+        self.head = 0
+        self.orphanCount += 1
+
+    def reserve(self, nbytes):
+        """Returns the offset of nbytes of fresh space; the buffer must be
+        bound"""
+        align = self.alignment
+        offset = (self.head + align - 1) // align * align
+        if offset + nbytes > self.capacity:
+            if nbytes > self.capacity:
+                capacity = self.capacity
+                while capacity < nbytes:
+                    capacity *= 2
+                self.capacity = capacity
+            self.orphan()
+            offset = 0
+        self.head = offset + nbytes
+        return offset
+
+    def write(self, data):
+        data = numpy.ascontiguousarray(data)
+        self.bind()
+        offset = self.reserve(data.nbytes)
+        gl.glBufferSubData(self.target, offset, data.nbytes, data.ctypes)
+        self.unbind()
+        self.writeCount += 1
+        self.bytesWritten += data.nbytes
+        return (self, offset)
+
+    def writeView(self, view, data, mode=None):
+        """Writes data and binds view to it.  A 'draw_elements' view draws
+        with mode, by default its current mode, and needs a ring created
+        with target=gl.GL_ELEMENT_ARRAY_BUFFER."""
+        data = numpy.ascontiguousarray(data)
+        if view.kind == 'draw_elements':
+            if self.target != gl.GL_ELEMENT_ARRAY_BUFFER:
+                raise GLBufferException("Element indices must be written to an element array ring buffer")
+            if mode is None:
+                mode = view.glid_mode
+            if mode is None:
+                raise ValueError("A draw mode is required to bind %r" % (view,))
+            buffer, offset = self.write(data)
+            view.bindBuffer(mode, buffer, offset, data.dtype, data.shape)
+            return view
+
+        buffer, offset = self.write(data)
+        if data.ndim >= 2:
+            stride = data.strides[-2]
+        else: stride = 0
+        view.bindBuffer(buffer, offset, data.dtype, data.shape, stride)
+        return view
+
+    def nextFrame(self):
+        self.frameCount += 1
+
+    def resetStats(self):
+        self.frameCount = 0
+        self.writeCount = 0
+        self.bytesWritten = 0
+        self.orphanCount = 0
+
+    def getStats(self):
+        return dict(
+            capacity=self.capacity, head=self.head,
+            frames=self.frameCount, writes=self.writeCount,
+            bytesWritten=self.bytesWritten, orphans=self.orphanCount,
+            bytesPerFrame=self.bytesWritten / max(self.frameCount, 1))
+    stats = property(getStats)
+
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-__all__ = [ArrayBuffer.__name__, ElementArrayBuffer.__name__]
+__all__ = [ArrayBuffer.__name__, ElementArrayBuffer.__name__, 
+        PixelPackBuffer.__name__, PixelUnpackBuffer.__name__,
+        StreamingRingBuffer.__name__]
 
@@ -11,9 +11,11 @@
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 from functools import partial
+from ctypes import c_void_p
+import numpy
 from numpy import asarray
 from ..raw import gl
-from .arrayViews import _dtype_gltype_map, _registerArrayView
+from .arrayViews import _dtype_gltype_map, _registerArrayView, _glCallAll
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Constants
@@ -47,6 +49,10 @@ class DrawArrayView(object):
     drawModes = drawModes
     glid_buffer = gl.GL_ELEMENT_ARRAY_BUFFER
     kind = 'draw_array'
+    data = None
+    glid_mode = None
+    buffer = None
+    bufferOffset = 0
     
     def config(klassOrSelf, kind=None):
         pass
@@ -59,6 +65,8 @@ class DrawArrayView(object):
             arr = asarray([arr.start, arr.stop], dtype='i')
         else: arr = asarray(arr, dtype='i')
         glid_mode = self.drawModes.get(mode, mode)
+        self.data = arr
+        self.glid_mode = glid_mode
 
         self._glsingle = partial(gl.glDrawArrays, glid_mode, arr[0], arr[1])
         if arr.ndim > 1:
@@ -75,24 +83,172 @@ class DrawArrayView(object):
     _glsingle = _glNoOP
     _glgroup = _glNoOP
 
+    _glCallAll = staticmethod(_glCallAll)
+
 _registerArrayView(DrawArrayView)
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+def elementGroups(ranges):
+    """Returns (counts, offsets) for glMultiDrawElements from a sequence of
+    (start, stop) index ranges or slices, both in elements"""
+    ranges = [(r.start, r.stop) if isinstance(r, slice) else r for r in ranges]
+    ranges = asarray(ranges, dtype='i').reshape(-1, 2)
+    offsets = ranges[:, 0].copy()
+    counts = ranges[:, 1] - offsets
+    return counts, offsets
+
+_indexTypes = ['B', 'H', 'I']
+
+def narrowIndices(arr, narrowest='B'):
+    """Returns (arr, (min, max)) with arr cast to the smallest unsigned
+    index type, no narrower than narrowest, that holds its range.  Raises
+    ValueError for negative indices or indices too large for any type."""
+    arr = asarray(arr)
+    if arr.size == 0:
+        return arr, (0, 0)
+    lo = int(arr.min())
+    hi = int(arr.max())
+    if lo < 0:
+        raise ValueError("Negative index %d is not a valid element index" % (lo,))
+
+    for typecode in _indexTypes[_indexTypes.index(narrowest):]:
+        if hi <= numpy.iinfo(typecode).max:
+            break
+    else:
+        raise ValueError("Index %d does not fit any of the index types %r" % (hi, _indexTypes))
+    if arr.dtype.char != typecode:
+        arr = arr.astype(typecode)
+    return arr, (lo, hi)
+
 class DrawElementArrayView(DrawArrayView):
     kind = 'draw_elements'
-    def bind(self, mode, arr, gl=gl):
+    groupCounts = None
+    groupOffsets = None
+
+    # GL_UNSIGNED_BYTE indices are slow paths on some hardware; set to 'H'
+    # to stop narrowing at shorts
+    narrowestIndexType = 'B'
+    indexType = None
+    indexRange = None
+    originalIndexBytes = 0
+    _narrowed = None # (source, key, arr, indexRange) of the last narrowing
+
+    def bind(self, mode, arr, counts=None, offsets=None, narrow=True, gl=gl):
+        """Draws the indices in arr.  If counts and offsets are given, send
+        draws those sub-ranges of arr with a single glMultiDrawElements;
+        offsets are in elements, and default to the groups lying back to
+        back from the start of arr.
+
+        With narrow, indices are cast to the smallest unsigned type holding
+        their range, and single draws use glDrawRangeElements.  With
+        narrow='cached', rebinding the same array object at the same
+        address reuses the last narrowed copy, for indices never changed in
+        place."""
         arr = asarray(arr)
+        self.originalIndexBytes = arr.nbytes
+        if narrow:
+            arr, indexRange = self._narrow(arr, narrow == 'cached')
+        else: indexRange = None
 
         glid_type = _dtype_gltype_map[arr.dtype.char][0]
         glid_mode = self.drawModes.get(mode, mode)
+        self.data = arr
+        self.glid_mode = glid_mode
+        self.indexType = arr.dtype.char
+        self.indexRange = indexRange
+
+        if indexRange is not None:
+            self._glsingle = partial(gl.glDrawRangeElements, glid_mode, indexRange[0], indexRange[1], arr.size, glid_type, arr.ctypes)
+        else:
+            self._glsingle = partial(gl.glDrawElements, glid_mode, arr.size, glid_type, arr.ctypes)
+        if counts is not None:
+            self._glgroup = self._glMultiDraw(glid_mode, glid_type, arr.ctypes.data, arr.itemsize, counts, offsets, gl)
+        else: self._glgroup = self._glsingle
+        return self
 
-        self._glsingle = partial(gl.glDrawElements, glid_mode, arr.size, glid_type, arr.ctypes)
-
-        #XXX: Implement this when used
-        #self._glgroup = partial(gl.glMultiDrawElements, glid_mode, arr[0].ctypes, glid_type, arr[1].ctypes)
-        self._glgroup = self._glsingle
+    def _narrow(self, arr, cached=False):
+        if not cached:
+            self._narrowed = None
+            return narrowIndices(arr, self.narrowestIndexType)
+
+        key = (arr.ctypes.data, arr.shape, arr.strides, arr.dtype.char, self.narrowestIndexType)
+        narrowed = self._narrowed
+        if narrowed is not None and narrowed[0] is arr and narrowed[1] == key:
+            return narrowed[2], narrowed[3]
+
+        result, indexRange = narrowIndices(arr, self.narrowestIndexType)
+        self._narrowed = (arr, key, result, indexRange)
+        return result, indexRange
+
+    def bindRanges(self, mode, arr, ranges, gl=gl):
+        """Binds arr for a grouped draw of ranges; see elementGroups"""
+        counts, offsets = elementGroups(ranges)
+        return self.bind(mode, arr, counts, offsets, gl=gl)
+
+    def bindBuffer(self, mode, buffer, offset=0, dtype='H', shape=None, counts=None, offsets=None, indexRange=None, gl=gl):
+        """Draws indices already in the GPU memory of buffer, an
+        ElementArrayBuffer, starting offset bytes in.  dtype and shape
+        describe the indices as bind's arr would, and counts and offsets
+        select sub-ranges as in bind.  A known (min, max) indexRange
+        enables glDrawRangeElements."""
+        dtype = numpy.dtype(dtype)
+        glid_type = _dtype_gltype_map[dtype.char][0]
+        glid_mode = self.drawModes.get(mode, mode)
+        count = 1
+        for e in shape or ():
+            count *= e
+
+        self.data = None
+        self.glid_mode = glid_mode
+        self.buffer = buffer
+        self.bufferOffset = offset
+        self.shape = shape
+        self.indexType = dtype.char
+        self.indexRange = indexRange
+        self.originalIndexBytes = count * dtype.itemsize
+
+        if indexRange is not None:
+            gldraw = partial(gl.glDrawRangeElements, glid_mode, indexRange[0], indexRange[1], count, glid_type, c_void_p(offset))
+        else:
+            gldraw = partial(gl.glDrawElements, glid_mode, count, glid_type, c_void_p(offset))
+        self._glsingle = self._glCallAll([buffer.bind, gldraw, buffer.unbind])
+        if counts is not None:
+            glmulti = self._glMultiDraw(glid_mode, glid_type, offset, dtype.itemsize, counts, offsets, gl)
+            self._glgroup = self._glCallAll([buffer.bind, glmulti, buffer.unbind])
+        else: self._glgroup = self._glsingle
         return self
 
+    def indexReport(self):
+        """Index storage of the bound mesh before and after narrowing"""
+        data = self.data
+        if data is not None:
+            indexBytes = data.nbytes
+            typecode = data.dtype.char
+        else:
+            indexBytes = self.originalIndexBytes
+            typecode = None
+        return dict(
+            indexType=typecode,
+            indexRange=self.indexRange,
+            originalBytes=self.originalIndexBytes,
+            bytes=indexBytes,
+            bytesSaved=self.originalIndexBytes - indexBytes)
+
+    def _glMultiDraw(self, glid_mode, glid_type, base, itemsize, counts, offsets, gl):
+        counts = asarray(counts, dtype='i')
+        if offsets is None:
+            offsets = numpy.cumsum(counts) - counts
+        offsets = asarray(offsets, dtype=numpy.intp)
+        if offsets.shape != counts.shape:
+            raise ValueError("Group counts and offsets must be the same length, not %d and %d" % (counts.size, offsets.size))
+        # glMultiDrawElements wants one pointer per group; either client
+        # memory addresses or byte offsets into the bound element buffer
+        ptrs = base + offsets * itemsize
+        self.groupCounts = counts
+        self.groupOffsets = offsets
+        self._groupPtrs = ptrs
+        return partial(gl.glMultiDrawElements, glid_mode, counts.ctypes, glid_type, ptrs.ctypes, len(counts))
+
 _registerArrayView(DrawElementArrayView)
 
@@ -0,0 +1,234 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from __future__ import with_statement
+
+import numpy
+
+from TG.ext.openGL import hasGLExtension
+from TG.ext.openGL.raw import gl
+from TG.ext.openGL.stackBlocks import glPixelStore
+
+from .bufferObjects import PixelPackBuffer
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Constants / Variiables / Etc.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+readFormatMap = {
+    'rgba': (gl.GL_RGBA, 4), 'bgra': (gl.GL_BGRA, 4),
+    'rgb': (gl.GL_RGB, 3), 'bgr': (gl.GL_BGR, 3),
+    'luminance': (gl.GL_LUMINANCE, 1), 'alpha': (gl.GL_ALPHA, 1),
+    'depth': (gl.GL_DEPTH_COMPONENT, 1), 'stencil': (gl.GL_STENCIL_INDEX, 1),
+    }
+
+readTypeMap = {
+    'B': gl.GL_UNSIGNED_BYTE, 'H': gl.GL_UNSIGNED_SHORT,
+    'I': gl.GL_UNSIGNED_INT, 'f': gl.GL_FLOAT,
+    }
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class FramebufferReader(object):
+    """Reads the framebuffer without stalling, through a ring of latency+1
+    pixel pack buffers.
+
+    Each read queues glReadPixels into the next pack buffer and maps the
+    one queued latency reads earlier, which the GPU has long finished, so
+    frames come back latency frames late.  With copy, frames are copied
+    into a ring of ringSize preallocated arrays; otherwise they are views
+    of the mapped buffer, valid until the next call.  Without pixel buffer
+    object support reads are synchronous."""
+
+    latency = 2
+    ringSize = 2
+    copy = True
+    packAlignment = 4 # GL_PACK_ALIGNMENT set for reads; rows are padded to it
+    rect = None
+
+    def __init__(self, rect=None, format='rgba', dtype='B', latency=None, copy=None, ringSize=None):
+        if rect is not None:
+            self.rect = rect
+        self.glformat, self.channels = readFormatMap[format]
+        self.dtype = numpy.dtype(dtype)
+        self.gltype = readTypeMap[self.dtype.char]
+        if latency is not None:
+            self.latency = latency
+        if copy is not None:
+            self.copy = copy
+        if ringSize is not None:
+            self.ringSize = ringSize
+
+        self._buffers = [None]*(self.latency + 1)
+        self._slots = [None]*(self.latency + 1)
+        self._outputs = []
+        self._outputIdx = 0
+        self._mapped = None
+        self.lastFrameIndex = None
+        self.resetStats()
+
+    _asyncViable = None
+    @classmethod
+    def checkAsyncViable(klass):
+        isViable = klass._asyncViable
+        if isViable is None:
+            isViable = hasGLExtension('GL_ARB_pixel_buffer_object', 'GL_EXT_pixel_buffer_object')
+            klass._asyncViable = isViable
+        return isViable
+
+    def resetStats(self):
+        self.frameCount = 0
+        self.asyncReads = 0
+        self.syncReads = 0
+        self.bytesRead = 0
+
+    def getStats(self):
+        return dict(frames=self.frameCount, asyncReads=self.asyncReads,
+            syncReads=self.syncReads, bytesRead=self.bytesRead,
+            pending=len([s for s in self._slots if s is not None]))
+    stats = property(getStats)
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def rowStride(self, w):
+        align = self.packAlignment
+        rowBytes = w*self.channels*self.dtype.itemsize
+        return (rowBytes + align - 1) // align * align
+
+    def read(self, rect=None):
+        """Queues a read of rect ((x, y), (w, h)), default self.rect, and
+        returns the frame queued latency reads ago, or None while the ring
+        is filling"""
+        self._unmapView()
+        if rect is None:
+            rect = self.rect
+        (x, y), (w, h) = rect
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        frameIndex = self.frameCount
+        self.frameCount += 1
+
+        if not self.checkAsyncViable():
+            self.lastFrameIndex = frameIndex
+            return self._readSync(x, y, w, h)
+
+        # the slot being read into was resolved by the previous call, so
+        # a mapped view never aliases a buffer glReadPixels is writing
+        slots = self._slots
+        result = None
+        ready = (frameIndex - self.latency) % len(slots)
+        if slots[ready] is not None:
+            result = self._resolve(slots[ready], self.copy)
+            slots[ready] = None
+        idx = frameIndex % len(slots)
+        slots[idx] = self._startRead(idx, frameIndex, x, y, w, h)
+        return result
+
+    def flush(self):
+        """Maps every pending read, oldest first, blocking as needed, and
+        returns the copied frames"""
+        self._unmapView()
+        slots = self._slots
+        count = len(slots)
+        frames = []
+        for i in xrange(count):
+            idx = (self.frameCount - self.latency + i) % count
+            if slots[idx] is not None:
+                frames.append(self._resolve(slots[idx], True))
+                slots[idx] = None
+        return frames
+
+    def release(self):
+        self._unmapView()
+        self._slots = [None]*len(self._slots)
+        for pbo in self._buffers:
+            if pbo is not None:
+                pbo.release()
+        self._buffers = [None]*len(self._buffers)
+        self._outputs = []
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _startRead(self, idx, frameIndex, x, y, w, h):
+        nbytes = h*self.rowStride(w)
+        pbo = self._buffers[idx]
+        if pbo is None:
+            pbo = PixelPackBuffer()
+            self._buffers[idx] = pbo
+        else: pbo.bind()
+        if pbo.nbytes < nbytes:
+            pbo.allocate(nbytes)
+
+        with glPixelStore(gl.GL_PACK_ALIGNMENT, self.packAlignment):
+            gl.glReadPixels(x, y, w, h, self.glformat, self.gltype, None)
+        pbo.unbind()
+        self.asyncReads += 1
+        self.bytesRead += nbytes
+        return (pbo, frameIndex, w, h)
+
+    def _resolve(self, slot, copy):
+        pbo, frameIndex, w, h = slot
+        self.lastFrameIndex = frameIndex
+        pbo.bind()
+        mapping = pbo.mapRange(0, h*self.rowStride(w), 'r', numpy.ubyte)
+        try:
+            frame = self._frameView(mapping.map(), w, h)
+            if copy:
+                frame = self._copyFrame(frame)
+        finally:
+            if copy:
+                mapping.unmap()
+            else: self._mapped = (pbo, mapping)
+            pbo.unbind()
+        return frame
+
+    def _unmapView(self):
+        if self._mapped is not None:
+            pbo, mapping = self._mapped
+            self._mapped = None
+            pbo.bind()
+            mapping.unmap()
+            pbo.unbind()
+
+    def _readSync(self, x, y, w, h):
+        raw = numpy.empty(h*self.rowStride(w), numpy.ubyte)
+        with glPixelStore(gl.GL_PACK_ALIGNMENT, self.packAlignment):
+            gl.glReadPixels(x, y, w, h, self.glformat, self.gltype, raw.ctypes)
+        self.syncReads += 1
+        self.bytesRead += raw.nbytes
+        frame = self._frameView(raw, w, h)
+        if self.copy:
+            frame = self._copyFrame(frame)
+        return frame
+
+    def _frameView(self, raw, w, h):
+        """Views raw padded rows as an (h, w, channels) array, or (h, w) for
+        single channel formats"""
+        itemsize = self.dtype.itemsize
+        channels = self.channels
+        frame = numpy.ndarray((h, w, channels), self.dtype, buffer=raw,
+                strides=(self.rowStride(w), channels*itemsize, itemsize))
+        if channels == 1:
+            frame = frame[..., 0]
+        return frame
+
+    def _copyFrame(self, frame):
+        outputs = self._outputs
+        if not outputs or outputs[0].shape != frame.shape:
+            outputs[:] = [numpy.empty(frame.shape, self.dtype) for i in xrange(self.ringSize)]
+            self._outputIdx = 0
+
+        out = outputs[self._outputIdx]
+        self._outputIdx = (self._outputIdx + 1) % len(outputs)
+        out[...] = frame
+        return out
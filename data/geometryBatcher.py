@@ -0,0 +1,173 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import numpy
+from numpy import asarray, concatenate
+
+from .arrayViews import arrayView
+from .drawArrayViews import DrawElementArrayView, drawModes
+from .stripStitching import _stripModes, stitchWithoutRestart
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class GeometryBatch(object):
+    """Chunks collected for one (state key, mode) pair during a frame"""
+    attrKinds = ('vertex', 'color', 'texture_coord')
+
+    def __init__(self, key, mode):
+        self.key = key
+        self.mode = mode
+        self.glid_mode = drawModes.get(mode, mode)
+        self.chunks = []
+        self.views = {}
+        self.elements = DrawElementArrayView()
+
+    def add(self, vertices, indices, colors=None, texcoords=None):
+        chunk = (asarray(vertices), asarray(indices), colors, texcoords)
+        if self.chunks:
+            prev = self.chunks[0]
+            if (prev[2] is None) != (colors is None) or (prev[3] is None) != (texcoords is None):
+                raise ValueError("All chunks of a batch must supply the same vertex attributes")
+        self.chunks.append(chunk)
+
+    def merge(self):
+        """Concatenates the chunks, rebasing each chunk's indices past the
+        vertices of the chunks before it.  For strip, fan and loop modes
+        each chunk is one strip, and the strips are stitched with
+        stitchWithoutRestart so they stay separate primitives.  Returns
+        (attrs, glid_mode, indices)."""
+        chunks = self.chunks
+        vertexCounts = asarray([len(c[0]) for c in chunks])
+        indexCounts = asarray([c[1].size for c in chunks])
+        bases = numpy.cumsum(vertexCounts) - vertexCounts
+
+        if vertexCounts.sum() <= 0x10000:
+            idxType = 'H'
+        else: idxType = 'I'
+        indices = concatenate([c[1].ravel() for c in chunks]).astype(idxType)
+        indices += numpy.repeat(bases, indexCounts).astype(idxType)
+
+        glid_mode = self.glid_mode
+        if glid_mode in _stripModes:
+            strips = numpy.split(indices, numpy.cumsum(indexCounts)[:-1])
+            glid_mode, indices = stitchWithoutRestart(glid_mode, strips)
+            indices = asarray(indices, idxType)
+
+        attrs = [concatenate([c[0] for c in chunks])]
+        for i in (2, 3):
+            if chunks[0][i] is not None:
+                attrs.append(concatenate([asarray(c[i]) for c in chunks]))
+            else: attrs.append(None)
+        return attrs, glid_mode, indices
+
+    def draw(self):
+        attrs, glid_mode, indices = self.merge()
+        active = []
+        for kind, data in zip(self.attrKinds, attrs):
+            if data is None:
+                continue
+            view = self.views.get(kind)
+            if view is None:
+                view = arrayView(kind)
+                self.views[kind] = view
+            view.bind(data)
+            active.append(view)
+
+        for view in active:
+            view.enable()
+            view.send()
+        self.elements.bind(glid_mode, indices)
+        self.elements.send()
+        for view in active:
+            view.disable()
+
+        chunkCount = len(self.chunks)
+        del self.chunks[:]
+        return chunkCount, len(attrs[0]), indices.size
+
+class GeometryBatcher(object):
+    """Collects many small indexed chunks per frame and draws all chunks
+    that share a state key with a single glDrawElements.
+
+    Chunks are (vertices, indices[, colors][, texcoords]) numpy arrays with
+    indices local to the chunk.  flush() draws every pending batch, calling
+    applyState(key) before each one."""
+
+    GeometryBatch = GeometryBatch
+
+    def __init__(self, applyState=None):
+        self.applyState = applyState
+        self._batches = {}
+        self._order = []
+        self.resetStats()
+
+    def add(self, key, vertices, indices, colors=None, texcoords=None, mode='tris'):
+        batchKey = (key, mode)
+        batch = self._batches.get(batchKey)
+        if batch is None:
+            batch = self.GeometryBatch(key, mode)
+            self._batches[batchKey] = batch
+        if not batch.chunks:
+            self._order.append(batch)
+        batch.add(vertices, indices, colors, texcoords)
+        self.chunkSizeCount += 1
+        self.chunkSizeTotal += len(vertices)
+        self.chunkSizeMax = max(self.chunkSizeMax, len(vertices))
+
+    def flush(self):
+        applyState = self.applyState
+        order = self._order
+        self._order = []
+        for batch in order:
+            if applyState is not None:
+                applyState(batch.key)
+            chunkCount, vertexCount, indexCount = batch.draw()
+            self.drawCount += 1
+            self.chunkCount += chunkCount
+            self.vertexCount += vertexCount
+            self.indexCount += indexCount
+        self.flushCount += 1
+        return len(order)
+
+    def clear(self):
+        for batch in self._order:
+            del batch.chunks[:]
+        self._order = []
+
+    def release(self):
+        self.clear()
+        self._batches.clear()
+
+    def resetStats(self):
+        self.flushCount = 0
+        self.drawCount = 0
+        self.chunkCount = 0
+        self.vertexCount = 0
+        self.indexCount = 0
+        self.chunkSizeCount = 0
+        self.chunkSizeTotal = 0
+        self.chunkSizeMax = 0
+
+    def getStats(self):
+        return dict(
+            flushes=self.flushCount,
+            draws=self.drawCount,
+            chunks=self.chunkCount,
+            vertices=self.vertexCount,
+            indices=self.indexCount,
+            chunksPerDraw=self.chunkCount / max(self.drawCount, 1.),
+            chunkSizeMean=self.chunkSizeTotal / max(self.chunkSizeCount, 1.),
+            chunkSizeMax=self.chunkSizeMax,
+            )
+    stats = property(getStats)
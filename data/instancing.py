@@ -0,0 +1,240 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from functools import partial
+from ctypes import c_void_p
+
+import numpy
+from numpy import asarray
+
+from .. import hasGLExtension
+from ..raw import gl, glext
+from .arrayViews import arrayView, _dtype_gltype_map, _glCallAll
+from .drawArrayViews import DrawElementArrayView
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# modes whose primitives are independent, so copies can share one draw
+_batchableModes = set([
+    gl.GL_POINTS, gl.GL_LINES, gl.GL_TRIANGLES, gl.GL_QUADS])
+
+def hasHardwareInstancing():
+    return (hasGLExtension('GL_ARB_draw_instanced')
+        and hasGLExtension('GL_ARB_instanced_arrays'))
+
+class InstancedDrawView(object):
+    """Draws one mesh many times in a single call.
+
+    views are the mesh's array views and draw its DrawArrayView or
+    DrawElementArrayView.  Per-instance transforms are (n, 4, 4) row-major
+    matrices applied as transform.dot(vertex); colors are (n, 3) or (n, 4).
+
+    With ARB_draw_instanced and ARB_instanced_arrays, and a shader taking
+    the transform as a mat4 attribute at transformLocation (and optionally
+    the color at colorLocation), instances are drawn by the hardware.
+    Otherwise transformed copies of the mesh are built on the CPU and drawn
+    as one batch, or, for strip and fan modes, with one draw per instance."""
+
+    transforms = None
+    colors = None
+
+    def __init__(self, views, draw, transformLocation=None, colorLocation=None):
+        self.views = list(views)
+        self.draw = draw
+        self.transformLocation = transformLocation
+        self.colorLocation = colorLocation
+
+    def isHardware(self):
+        return self.transformLocation is not None and hasHardwareInstancing()
+
+    def bindInstances(self, transforms=None, colors=None):
+        if transforms is not None:
+            transforms = asarray(transforms, dtype='f').reshape(-1, 4, 4)
+        if colors is not None:
+            colors = asarray(colors)
+        self.transforms = transforms
+        self.colors = colors
+        self.count = self._instanceCount()
+
+        if self.isHardware():
+            self._glsend = self._bindHardware()
+        else:
+            self._glsend = self._bindCPU()
+        return self
+
+    def send(self):
+        self._glsend()
+
+    def _glNoOP(self): pass
+    _glsend = _glNoOP
+
+    def _instanceCount(self):
+        for arr in (self.transforms, self.colors):
+            if arr is not None:
+                return len(arr)
+        return 0
+
+    #~ Hardware instancing ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _instanceAttrib(self, location, arr):
+        view = arrayView('vertex_attrib')
+        view.bind(arr, location, normalized=(arr.dtype.kind in 'ui'))
+        view._glenable = _glCallAll([view._glenable,
+            partial(glext.glVertexAttribDivisorARB, location, 1)])
+        view._gldisable = _glCallAll([
+            partial(glext.glVertexAttribDivisorARB, location, 0), view._gldisable])
+        return view
+
+    def _bindHardware(self):
+        instanceViews = []
+        if self.transforms is not None:
+            # a mat4 attribute takes one location per column; store columns
+            # contiguously so each is a strided (n, 4) array
+            columns = numpy.ascontiguousarray(self.transforms.transpose(0, 2, 1))
+            self._columns = columns
+            loc = self.transformLocation
+            for c in xrange(4):
+                instanceViews.append(self._instanceAttrib(loc + c, columns[:, c, :]))
+        if self.colors is not None and self.colorLocation is not None:
+            instanceViews.append(self._instanceAttrib(self.colorLocation, self.colors))
+        self.instanceViews = instanceViews
+
+        calls = []
+        for view in self.views + instanceViews:
+            calls.extend([view._glenable, view._glsend])
+        calls.append(self._glDrawInstanced())
+        for view in self.views + instanceViews:
+            calls.append(view._gldisable)
+        return _glCallAll(calls)
+
+    def _glDrawInstanced(self):
+        draw = self.draw
+        if isinstance(draw, DrawElementArrayView):
+            if draw.data is not None:
+                data = draw.data
+                glid_type = _dtype_gltype_map[data.dtype.char][0]
+                return partial(glext.glDrawElementsInstancedARB, draw.glid_mode, data.size, glid_type, data.ctypes, self.count)
+
+            buffer = draw.buffer
+            count = numpy.prod(draw.shape or ())
+            glid_type = _dtype_gltype_map[draw.indexType][0]
+            gldraw = partial(glext.glDrawElementsInstancedARB, draw.glid_mode, int(count), glid_type, c_void_p(draw.bufferOffset), self.count)
+            return _glCallAll([buffer.bind, gldraw, buffer.unbind])
+
+        first, count = draw.data[:2]
+        return partial(glext.glDrawArraysInstancedARB, draw.glid_mode, int(first), int(count), self.count)
+
+    #~ CPU fallback ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _meshIndices(self):
+        draw = self.draw
+        if draw.data is None:
+            raise ValueError("CPU instancing needs client side indices, not a buffer bound draw")
+        if isinstance(draw, DrawElementArrayView):
+            return draw.data.ravel()
+        first, count = draw.data[:2]
+        return numpy.arange(first, first + count)
+
+    def _bindCPU(self):
+        if self.draw.glid_mode not in _batchableModes:
+            return self._bindLoop()
+
+        n = self.count
+        indices = self._meshIndices()
+        meshViews = [v for v in self.views if v.data is not None]
+        vertexCount = max(len(v.data) for v in meshViews if v.data.ndim >= 2)
+
+        bases = numpy.arange(n) * vertexCount
+        batchIndices = (indices[None, :] + bases[:, None]).ravel()
+
+        batchViews = []
+        hasColor = False
+        for view in meshViews:
+            data = view.data
+            if data.ndim < 2:
+                batchViews.append(view)
+                continue
+            if view.kind == 'vertex':
+                data = self._transformPoints(data)
+            elif view.kind == 'normal':
+                data = self._transformNormals(data)
+            elif view.kind == 'color' and self.colors is not None:
+                hasColor = True
+                data = numpy.repeat(self.colors, len(data), 0)
+            else:
+                data = numpy.tile(data, (n, 1))
+            batchView = arrayView(view.kind)
+            if view.kind == 'vertex_attrib':
+                batchView.bind(data, view.location, view.normalized)
+            else: batchView.bind(data)
+            batchViews.append(batchView)
+
+        if not hasColor and self.colors is not None:
+            batchView = arrayView('color')
+            batchView.bind(numpy.repeat(self.colors, vertexCount, 0))
+            batchViews.append(batchView)
+
+        self.batchViews = batchViews
+        self.batchDraw = DrawElementArrayView().bind(self.draw.glid_mode, batchIndices)
+
+        calls = []
+        for view in batchViews:
+            calls.extend([view._glenable, view._glsend])
+        calls.append(self.batchDraw._glgroup)
+        for view in batchViews:
+            calls.append(view._gldisable)
+        return _glCallAll(calls)
+
+    def _transformPoints(self, data):
+        if self.transforms is None:
+            return numpy.tile(data, (self.count, 1))
+        dim = data.shape[-1]
+        pts = numpy.ones((len(data), 4), 'f')
+        pts[:, :dim] = data
+        if dim < 3:
+            pts[:, dim:3] = 0
+        out = numpy.dot(pts, self.transforms.transpose(0, 2, 1))
+        out = out.transpose(1, 0, 2).reshape(-1, 4)
+        if dim == 4:
+            return out
+        return out[:, :3] / out[:, 3:4]
+
+    def _transformNormals(self, data):
+        if self.transforms is None:
+            return numpy.tile(data, (self.count, 1))
+        rot = self.transforms[:, :3, :3]
+        out = numpy.dot(asarray(data, 'f'), rot.transpose(0, 2, 1))
+        out = out.transpose(1, 0, 2).reshape(-1, 3)
+        lengths = numpy.sqrt((out**2).sum(-1))
+        return out / numpy.where(lengths > 0, lengths, 1.)[:, None]
+
+    def _bindLoop(self):
+        calls = []
+        for view in self.views:
+            calls.extend([view._glenable, view._glsend])
+        for i in xrange(self.count):
+            if self.transforms is not None:
+                calls.append(gl.glPushMatrix)
+                calls.append(partial(gl.glMultMatrixf, self.transforms[i].T.copy().ctypes))
+            if self.colors is not None:
+                color = numpy.ascontiguousarray(self.colors[i])
+                colorSend = arrayView('color')
+                colorSend.bind(color)
+                calls.append(colorSend._glsend)
+            calls.append(self.draw._glgroup)
+            if self.transforms is not None:
+                calls.append(gl.glPopMatrix)
+        for view in self.views:
+            calls.append(view._gldisable)
+        return _glCallAll(calls)
@@ -0,0 +1,186 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import weakref
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def mipChainBytes(size, texelBytes):
+    """Bytes of a full mipmap chain down to 1 texel for a base level of
+    size texels per dimension"""
+    size = [int(e) for e in size]
+    total = 0
+    while True:
+        count = 1
+        for e in size:
+            count *= e
+        total += count*texelBytes
+        if max(size) <= 1:
+            return total
+        size = [max(1, e >> 1) for e in size]
+
+class MemoryRecord(object):
+    def __init__(self, ref, kind, nbytes, usage, owner, frame):
+        self.ref = ref
+        self.kind = kind
+        self.nbytes = nbytes
+        self.usage = usage
+        self.owner = owner
+        self.created = frame
+        self.lastUse = frame
+
+    def __repr__(self):
+        return '<%s %s %d bytes owner:%r lastUse:%d>' % (self.__class__.__name__, self.kind, self.nbytes, self.owner, self.lastUse)
+
+    def getObject(self):
+        return self.ref()
+    object = property(getObject)
+
+class MemoryRegistry(object):
+    """Accounts for GPU memory held by buffer objects and textures.
+
+    Each tracked object has a record of its bytes, usage hint, owner tag
+    and the frame it was last bound in; records go away with release or
+    when the object is collected.  Totals keep high-water marks, and when
+    budget is exceeded the budget callbacks are called with (registry,
+    excess) in turn until one brings the total back under it, typically
+    by releasing least recently used objects."""
+
+    budget = None
+
+    def __init__(self, budget=None):
+        if budget is not None:
+            self.budget = budget
+        self.frame = 0
+        self.records = {}
+        self.totals = {}
+        self.highWater = {}
+        self.budgetCallbacks = []
+        self._inBudgetCheck = False
+
+    def nextFrame(self):
+        self.frame += 1
+        return self.frame
+
+    def track(self, obj, kind, nbytes, usage=None, owner=None):
+        """Records obj as holding nbytes, replacing any previous record"""
+        key = id(obj)
+        record = self.records.get(key)
+        if record is None:
+            ref = weakref.ref(obj, lambda wr, key=key: self._untrackKey(key))
+            record = MemoryRecord(ref, kind, 0, usage, owner, self.frame)
+            self.records[key] = record
+        else:
+            record.usage = usage
+            record.owner = owner
+            record.lastUse = self.frame
+
+        self._adjust(record.kind, nbytes - record.nbytes)
+        record.nbytes = nbytes
+        self.checkBudget()
+        return record
+
+    def untrack(self, obj):
+        self._untrackKey(id(obj))
+    def _untrackKey(self, key):
+        record = self.records.pop(key, None)
+        if record is not None:
+            self._adjust(record.kind, -record.nbytes)
+
+    def touch(self, obj):
+        record = self.records.get(id(obj))
+        if record is not None:
+            record.lastUse = self.frame
+
+    def _adjust(self, kind, delta):
+        totals = self.totals
+        highWater = self.highWater
+        for key in (kind, None):
+            total = totals.get(key, 0) + delta
+            totals[key] = total
+            if total > highWater.get(key, 0):
+                highWater[key] = total
+
+    def getTotal(self, kind=None):
+        return self.totals.get(kind, 0)
+    total = property(getTotal)
+
+    def resetHighWater(self):
+        self.highWater = dict(self.totals)
+
+    #~ Budgets ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def addBudgetCallback(self, callback):
+        self.budgetCallbacks.append(callback)
+    def removeBudgetCallback(self, callback):
+        self.budgetCallbacks.remove(callback)
+
+    def checkBudget(self):
+        """Calls budget callbacks while over budget; True if within it"""
+        budget = self.budget
+        if budget is None or self.total <= budget:
+            return True
+        if self._inBudgetCheck:
+            return False
+
+        self._inBudgetCheck = True
+        try:
+            for callback in self.budgetCallbacks[:]:
+                callback(self, self.total - budget)
+                if self.total <= budget:
+                    return True
+        finally:
+            self._inBudgetCheck = False
+        return False
+
+    def leastRecentlyUsed(self, kind=None, minAge=1):
+        """Records unused for at least minAge frames, oldest first"""
+        lastFrame = self.frame - minAge
+        result = [r for r in self.records.itervalues()
+                    if r.lastUse <= lastFrame and (kind is None or r.kind == kind)]
+        result.sort(key=lambda r: r.lastUse)
+        return result
+
+    #~ Reports ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def report(self, groupBy='owner'):
+        """Returns [(group, count, bytes)] largest first, grouping records
+        by the named attribute: 'owner', 'kind' or 'usage'"""
+        groups = {}
+        for record in self.records.itervalues():
+            group = getattr(record, groupBy)
+            entry = groups.get(group)
+            if entry is None:
+                entry = groups[group] = [group, 0, 0]
+            entry[1] += 1
+            entry[2] += record.nbytes
+
+        result = [tuple(e) for e in groups.itervalues()]
+        result.sort(key=lambda e: e[2], reverse=True)
+        return result
+
+    def printReport(self, groupBy='owner', out=None):
+        print >> out, 'GPU memory: %d bytes in %d objects (high water %d)' % (
+                self.total, len(self.records), self.highWater.get(None, 0))
+        for group, count, nbytes in self.report(groupBy):
+            print >> out, '    %-32s %6d %12d' % (group, count, nbytes)
+
+    def getStats(self):
+        return dict(frame=self.frame, objects=len(self.records),
+            total=self.total, highWater=self.highWater.get(None, 0),
+            buffers=self.getTotal('buffer'), textures=self.getTotal('texture'),
+            budget=self.budget)
+    stats = property(getStats)
+
+memoryRegistry = MemoryRegistry()
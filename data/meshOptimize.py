@@ -0,0 +1,298 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+"""Offline optimization of static indexed meshes.
+
+The usual pipeline is dedupeVertices, quadsToTriangles, optimizeVertexCache
+and reorderVertices, optionally followed by triangleStrips.  optimizeMesh
+runs all of them and reports the average cache miss ratio (ACMR) before
+and after."""
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import numpy
+from numpy import asarray, arange
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Constants
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+defaultCacheSize = 32
+
+# Forsyth's "Linear-speed vertex cache optimisation" scoring constants
+cacheDecayPower = 1.5
+lastTriScore = 0.75
+valenceBoostScale = 2.0
+valenceBoostPower = 0.5
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Vertex data
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _rowKeys(arrays, precision=None):
+    """Returns one opaque void scalar per row, joining the bytes of every
+    array in arrays"""
+    rows = []
+    for arr in arrays:
+        arr = asarray(arr)
+        arr = arr.reshape(len(arr), -1)
+        if precision is not None and arr.dtype.kind == 'f':
+            arr = numpy.round(arr / precision).astype(numpy.int64)
+        arr = numpy.ascontiguousarray(arr)
+        rows.append(arr.view(numpy.uint8).reshape(len(arr), -1))
+    rows = numpy.ascontiguousarray(numpy.hstack(rows))
+    return rows.view(numpy.dtype((numpy.void, rows.shape[1]))).ravel()
+
+def dedupeVertices(vertices, indices=None, attrs=(), precision=None):
+    """Merges vertices whose position and attrs rows are identical.
+
+    indices defaults to an unindexed mesh.  If precision is given, float
+    rows are compared after rounding to that grid.  Returns (vertices,
+    indices, attrs), keeping the first occurrence order."""
+    vertices = asarray(vertices)
+    if indices is None:
+        indices = arange(len(vertices))
+    indices = asarray(indices)
+
+    keys = _rowKeys((vertices,) + tuple(attrs), precision)
+    uniq, first, inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+    order = numpy.argsort(first)
+    rank = numpy.empty(len(order), indices.dtype)
+    rank[order] = arange(len(order))
+    remap = rank[inverse.ravel()]
+
+    keep = first[order]
+    attrs = [asarray(a)[keep] for a in attrs]
+    return vertices[keep], remap[indices], attrs
+
+def reorderVertices(vertices, indices, attrs=()):
+    """Renumbers vertices in the order the indices first use them, dropping
+    unreferenced vertices.  Returns (vertices, indices, attrs)."""
+    indices = asarray(indices)
+    flat = indices.ravel()
+    uniq, first = numpy.unique(flat, return_index=True)
+    order = uniq[numpy.argsort(first)]
+
+    remap = numpy.zeros(len(vertices), indices.dtype)
+    remap[order] = arange(len(order))
+    attrs = [asarray(a)[order] for a in attrs]
+    return asarray(vertices)[order], remap[indices], attrs
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Primitives
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def quadsToTriangles(indices):
+    """Splits each quad (a,b,c,d) into triangles (a,b,c) and (a,c,d)"""
+    quads = asarray(indices).reshape(-1, 4)
+    return quads[:, [0, 1, 2, 0, 2, 3]].reshape(-1)
+
+def triangleStrips(indices):
+    """Greedily walks shared edges to build triangle strips from a
+    triangle list.  Returns a list of strips, each an index list."""
+    tris = asarray(indices).reshape(-1, 3).tolist()
+    edges = {}
+    for t, (a, b, c) in enumerate(tris):
+        edges.setdefault((a, b), []).append((t, c))
+        edges.setdefault((b, c), []).append((t, a))
+        edges.setdefault((c, a), []).append((t, b))
+
+    used = [False] * len(tris)
+    def nextTri(p, q):
+        for t, d in edges.get((p, q), ()):
+            if not used[t]:
+                return t, d
+        return None
+
+    strips = []
+    for t, tri in enumerate(tris):
+        if used[t]:
+            continue
+        used[t] = True
+        strip = list(tri)
+        while 1:
+            # triangle k of a strip is (s[k], s[k+1], s[k+2]), with the first
+            # two swapped on odd k to keep the winding
+            p, q = strip[-2:]
+            if len(strip) % 2:
+                found = nextTri(q, p)
+            else: found = nextTri(p, q)
+            if found is None:
+                break
+            used[found[0]] = True
+            strip.append(found[1])
+        strips.append(strip)
+    return strips
+
+def joinStrips(strips):
+    """Joins strips into one index array using degenerate triangles"""
+    joined = []
+    for strip in strips:
+        if joined:
+            joined.extend([joined[-1], strip[0]])
+            if len(joined) % 2:
+                joined.append(strip[0])
+        joined.extend(strip)
+    return asarray(joined)
+
+def stripToTriangles(strip):
+    """Expands a triangle strip into a triangle list, dropping degenerates"""
+    strip = asarray(strip)
+    k = arange(len(strip) - 2)
+    odd = k % 2
+    tris = numpy.column_stack([strip[k + odd], strip[k + 1 - odd], strip[k + 2]])
+    degenerate = ((tris[:, 0] == tris[:, 1]) | (tris[:, 1] == tris[:, 2]) | (tris[:, 0] == tris[:, 2]))
+    return tris[~degenerate].reshape(-1)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Vertex cache
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def acmr(indices, cacheSize=defaultCacheSize):
+    """Average cache miss ratio of a triangle list on a FIFO cache of
+    cacheSize vertices; 0.5 is ideal for a regular grid, 3.0 is worst"""
+    flat = asarray(indices).ravel().tolist()
+    if not flat:
+        return 0.
+    cache = []
+    inCache = set()
+    misses = 0
+    for v in flat:
+        if v not in inCache:
+            misses += 1
+            cache.append(v)
+            inCache.add(v)
+            if len(cache) > cacheSize:
+                inCache.discard(cache.pop(0))
+    return misses / (len(flat) / 3.)
+
+def _vertexScore(cachePos, liveTris, cacheSize):
+    if liveTris == 0:
+        return -1.
+    score = 0.
+    if cachePos >= 0:
+        if cachePos < 3:
+            score = lastTriScore
+        else:
+            score = (1. - (cachePos - 3) / float(cacheSize - 3)) ** cacheDecayPower
+    return score + valenceBoostScale * liveTris ** -valenceBoostPower
+
+def optimizeVertexCache(indices, cacheSize=defaultCacheSize):
+    """Reorders a triangle list for post-transform vertex cache locality
+    using Forsyth's linear-speed algorithm.  Intended for offline use."""
+    indices = asarray(indices)
+    tris = indices.reshape(-1, 3)
+    triCount = len(tris)
+    if triCount == 0:
+        return indices.copy()
+
+    flat = tris.ravel()
+    vertCount = int(flat.max()) + 1
+    entryOrder = numpy.argsort(flat, kind='mergesort')
+    bounds = numpy.searchsorted(flat[entryOrder], arange(vertCount + 1))
+    entryTris = (entryOrder // 3).tolist()
+    bounds = bounds.tolist()
+    vertTris = [entryTris[bounds[v]:bounds[v+1]] for v in xrange(vertCount)]
+
+    liveTris = [len(ts) for ts in vertTris]
+    cachePos = [-1] * vertCount
+    vertScore = [_vertexScore(-1, n, cacheSize) for n in liveTris]
+    triVerts = tris.tolist()
+    triScore = [vertScore[a] + vertScore[b] + vertScore[c] for a, b, c in triVerts]
+    triAdded = [False] * triCount
+
+    result = []
+    cache = []
+    bestTri = int(numpy.argmax(triScore))
+    scanFrom = 0
+    for step in xrange(triCount):
+        if bestTri < 0:
+            # nothing in the cache has live triangles; take the next unused one
+            while triAdded[scanFrom]:
+                scanFrom += 1
+            bestTri = scanFrom
+
+        tri = triVerts[bestTri]
+        result.append(tri)
+        triAdded[bestTri] = True
+        for v in tri:
+            liveTris[v] -= 1
+            vertTris[v].remove(bestTri)
+
+        newCache = list(tri) + [v for v in cache if v not in tri]
+        cache = newCache[:cacheSize]
+
+        bestTri = -1
+        bestScore = -1.
+        for pos, v in enumerate(newCache):
+            if pos >= cacheSize:
+                pos = -1
+            cachePos[v] = pos
+            score = _vertexScore(pos, liveTris[v], cacheSize)
+            delta = score - vertScore[v]
+            vertScore[v] = score
+            for t in vertTris[v]:
+                triScore[t] += delta
+                if triScore[t] > bestScore:
+                    bestScore = triScore[t]
+                    bestTri = t
+
+    return asarray(result, indices.dtype).reshape(indices.shape)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Pipeline
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class OptimizedMesh(object):
+    """Result of optimizeMesh; bind indices with DrawElementArrayView
+    using mode ('tris' or 'triStrip')"""
+
+    def __init__(self, vertices, indices, attrs, mode, report):
+        self.vertices = vertices
+        self.indices = indices
+        self.attrs = attrs
+        self.mode = mode
+        self.report = report
+
+    def __repr__(self):
+        return '<%s %s %d verts %d indices>' % (self.__class__.__name__, self.mode, len(self.vertices), len(self.indices))
+
+def optimizeMesh(vertices, indices=None, attrs=(), mode='tris', strips=False, cacheSize=defaultCacheSize, precision=None):
+    """Runs the full pipeline on a 'tris' or 'quads' mesh"""
+    vertCountBefore = len(vertices)
+    if indices is None:
+        indices = arange(vertCountBefore)
+    if mode == 'quads':
+        indices = quadsToTriangles(indices)
+    elif mode not in ('tris', 'triangles'):
+        raise ValueError("Only triangle and quad meshes can be optimized, not %r" % (mode,))
+
+    vertices, indices, attrs = dedupeVertices(vertices, indices, attrs, precision)
+    acmrBefore = acmr(indices, cacheSize)
+    optimized = optimizeVertexCache(indices, cacheSize)
+    acmrAfter = acmr(optimized, cacheSize)
+    if acmrAfter < acmrBefore:
+        indices = optimized
+    else: acmrAfter = acmrBefore
+    vertices, indices, attrs = reorderVertices(vertices, indices, attrs)
+    report = dict(
+        vertexCountBefore=vertCountBefore,
+        vertexCountAfter=len(vertices),
+        triangleCount=len(indices) // 3,
+        acmrBefore=acmrBefore,
+        acmrAfter=acmrAfter,
+        cacheSize=cacheSize)
+
+    if strips:
+        indices = joinStrips(triangleStrips(indices)).astype(indices.dtype)
+        report['stripIndexCount'] = len(indices)
+        mode = 'triStrip'
+    else: mode = 'tris'
+    return OptimizedMesh(vertices, indices, attrs, mode, report)
@@ -0,0 +1,163 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from ..raw import gl
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def sizeClass(nbytes, minBytes=256):
+    """Rounds nbytes up to a power of two, no smaller than minBytes"""
+    size = minBytes
+    while size < nbytes:
+        size *= 2
+    return size
+
+class NamePool(object):
+    """Recycles GL object names, and the storage still attached to them,
+    instead of deleting and regenerating them.
+
+    Idle names are bucketed by a key describing their storage, e.g.
+    (target, size class, usage).  acquire prefers a name from the exact
+    bucket, then any idle name, then generates batchSize new names.  At
+    most highWater names are kept idle; the oldest beyond that are
+    deleted by recycle and trim."""
+
+    highWater = 256
+    batchSize = 16
+
+    def __init__(self, glGen, glDelete, highWater=None, batchSize=None):
+        self.glGen = glGen
+        self.glDelete = glDelete
+        if highWater is not None:
+            self.highWater = highWater
+        if batchSize is not None:
+            self.batchSize = batchSize
+        self.buckets = {}
+        self.idleOrder = []
+        self.fresh = []
+        self.resetStats()
+
+    def resetStats(self):
+        self.generated = 0
+        self.deleted = 0
+        self.acquired = 0
+        self.reusedStorage = 0
+        self.reusedName = 0
+        self.recycled = 0
+        self.live = 0
+        self.peakLive = 0
+        self.peakIdle = 0
+
+    def getIdleCount(self):
+        return len(self.idleOrder) + len(self.fresh)
+    idleCount = property(getIdleCount)
+
+    def acquire(self, key=None, exact=False):
+        """Returns (name, storageKey).  storageKey is key when the name
+        comes from the matching bucket with its storage intact, else None.
+        With exact, returns (None, None) rather than a non-matching name."""
+        bucket = self.buckets.get(key)
+        if key is not None and bucket:
+            name = bucket.pop()
+            self.idleOrder.remove((name, key))
+            self.reusedStorage += 1
+            storageKey = key
+        elif exact:
+            return None, None
+        elif self.fresh:
+            name = self.fresh.pop()
+            storageKey = None
+        elif self.idleOrder:
+            name, oldKey = self.idleOrder.pop(0)
+            self.buckets[oldKey].remove(name)
+            self.reusedName += 1
+            storageKey = None
+        else:
+            name = self._generate()
+            storageKey = None
+
+        self.acquired += 1
+        self.live += 1
+        self.peakLive = max(self.peakLive, self.live)
+        return name, storageKey
+
+    def _generate(self):
+        count = self.batchSize
+        names = (gl.GLuint * count)()
+        self.glGen(count, names)
+        self.generated += count
+        self.fresh.extend(names[1:])
+        return names[0]
+
+    def recycle(self, name, key=None):
+        self.live -= 1
+        self.recycled += 1
+        if key is None:
+            self.fresh.append(name)
+        else:
+            self.buckets.setdefault(key, []).append(name)
+            self.idleOrder.append((name, key))
+        self.peakIdle = max(self.peakIdle, self.idleCount)
+        if self.idleCount > self.highWater:
+            self.trim()
+
+    def trim(self, maxIdle=None):
+        """Deletes idle names, oldest storage first, down to maxIdle
+        (default highWater).  Returns the number deleted."""
+        if maxIdle is None:
+            maxIdle = self.highWater
+        excess = self.idleCount - maxIdle
+        if excess <= 0:
+            return 0
+
+        names = []
+        while excess > 0 and self.idleOrder:
+            name, key = self.idleOrder.pop(0)
+            self.buckets[key].remove(name)
+            names.append(name)
+            excess -= 1
+        while excess > 0 and self.fresh:
+            names.append(self.fresh.pop())
+            excess -= 1
+        self._delete(names)
+        return len(names)
+
+    def clear(self):
+        return self.trim(0)
+
+    def _delete(self, names):
+        if names:
+            arr = (gl.GLuint * len(names))(*names)
+            self.glDelete(len(names), arr)
+            self.deleted += len(names)
+
+    def getStats(self):
+        return dict(
+            live=self.live, peakLive=self.peakLive,
+            idle=self.idleCount, peakIdle=self.peakIdle,
+            buckets=len([b for b in self.buckets.itervalues() if b]),
+            generated=self.generated, deleted=self.deleted,
+            acquired=self.acquired, recycled=self.recycled,
+            reusedStorage=self.reusedStorage, reusedName=self.reusedName)
+    stats = property(getStats)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _genBuffers(n, names): gl.glGenBuffers(n, names)
+def _delBuffers(n, names): gl.glDeleteBuffers(n, names)
+def _genTextures(n, names): gl.glGenTextures(n, names)
+def _delTextures(n, names): gl.glDeleteTextures(n, names)
+
+bufferNamePool = NamePool(_genBuffers, _delBuffers)
+textureNamePool = NamePool(_genTextures, _delTextures)
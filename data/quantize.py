@@ -0,0 +1,218 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+"""Vertex attribute compression to the byte and short types arrayFormatInfo
+already accepts.
+
+Normals and colors use GL's own normalized integer conversion, so they bind
+directly.  Positions and texture coordinates are stored as integers relative
+to a per-mesh bias and scale, which QuantizedArray.applyTransform folds into
+the modelview or texture matrix."""
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import numpy
+from numpy import asarray
+
+from ..raw import gl
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Constants
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# candidate storage types per kind, smallest first; each must be allowed
+# by arrayFormatInfo for that kind
+quantizeTypes = {
+    'vertex': ('h', 'f'),
+    'texture_coord': ('h', 'f'),
+    'normal': ('b', 'h', 'f'),
+    'color': ('B', 'H', 'f'),
+    }
+
+# default largest acceptable absolute component error; positions and
+# texture coordinates are relative to the mesh extent
+defaultErrorBounds = {
+    'vertex': 1e-4,
+    'texture_coord': 1e-4,
+    'normal': 1e-2,
+    'color': 1./255,
+    }
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class QuantizedArray(object):
+    """Quantized attribute data; data decodes as data*scale + bias, except
+    for normalized kinds where GL performs the conversion"""
+
+    matrixModes = {
+        'vertex': gl.GL_MODELVIEW,
+        'texture_coord': gl.GL_TEXTURE,
+        }
+
+    scale = None
+    bias = None
+    normalized = False
+
+    def __init__(self, kind, data, originalBytes):
+        self.kind = kind
+        self.data = data
+        self.originalBytes = originalBytes
+
+    def __repr__(self):
+        return '<%s %s %s maxError:%g>' % (self.__class__.__name__, self.kind, self.data.dtype.char, self.maxError)
+
+    def decode(self):
+        data = self.data
+        if data.dtype.kind == 'f':
+            return data
+        if self.normalized:
+            return _decodeNormalized(data)
+        return data * self.scale + self.bias
+
+    def measure(self, original):
+        err = abs(self.decode() - original)
+        self.maxError = float(err.max()) if err.size else 0.
+        self.rmsError = float(numpy.sqrt((err**2).mean())) if err.size else 0.
+        return self.maxError
+
+    def hasTransform(self):
+        return self.scale is not None and self.data.dtype.kind != 'f'
+
+    def getMatrix(self):
+        """The 4x4 matrix taking quantized (x, y, z, 1) to decoded values,
+        as applyTransform builds it; identity without a transform"""
+        m = numpy.identity(4)
+        if self.hasTransform():
+            m[[0, 1, 2], [0, 1, 2]] = _pad3(self.scale, 1.)
+            m[:3, 3] = _pad3(self.bias, 0.)
+        return m
+    matrix = property(getMatrix)
+
+    def applyTransform(self, gl=gl):
+        """Multiplies the bias and scale into the current matrix of the
+        kind's matrix mode.  The caller is responsible for push and pop."""
+        if not self.hasTransform():
+            return
+        bias = _pad3(self.bias, 0.)
+        scale = _pad3(self.scale, 1.)
+        gl.glMatrixMode(self.matrixModes[self.kind])
+        gl.glTranslated(*bias)
+        gl.glScaled(*scale)
+
+    def report(self):
+        return dict(
+            kind=self.kind,
+            type=self.data.dtype.char,
+            originalBytes=self.originalBytes,
+            bytes=self.data.nbytes,
+            bytesSaved=self.originalBytes - self.data.nbytes,
+            maxError=self.maxError,
+            rmsError=self.rmsError)
+
+def _pad3(v, fill):
+    v = [float(e) for e in v]
+    if len(v) > 3:
+        raise ValueError("A matrix transform holds at most 3 components, not %d" % (len(v),))
+    return v + [fill] * (3 - len(v))
+
+def _decodeNormalized(data):
+    # GL 2.1 section 2.14: unsigned c/(2^b-1), signed (2c+1)/(2^b-1)
+    info = numpy.iinfo(data.dtype)
+    denom = float(info.max - info.min)
+    if info.min < 0:
+        return (2. * data + 1.) / denom
+    return data / denom
+
+def _encodeNormalized(arr, typecode):
+    info = numpy.iinfo(typecode)
+    denom = float(info.max - info.min)
+    if info.min < 0:
+        q = numpy.round((arr * denom - 1.) / 2.)
+    else: q = numpy.round(arr * denom)
+    return numpy.clip(q, info.min, info.max).astype(typecode)
+
+def _encodeScaled(arr, typecode):
+    """Returns (data, scale, bias) mapping the per-component extent of arr
+    onto the full integer range of typecode"""
+    info = numpy.iinfo(typecode)
+    lo = arr.min(0)
+    hi = arr.max(0)
+    bias = (lo + hi) * 0.5
+    scale = (hi - lo) / float(info.max - info.min)
+    scale = numpy.where(scale > 0, scale, 1.)
+    q = numpy.round((arr - bias) / scale)
+    return numpy.clip(q, info.min, info.max).astype(typecode), scale, bias
+
+def quantize(kind, arr, maxError=None, types=None):
+    """Quantizes arr for kind using the smallest type in types whose
+    measured error is within maxError.  Positions and texture coordinates
+    with 4 components are left in a float type, since the w bias cannot be
+    folded into a matrix."""
+    originalBytes = asarray(arr).nbytes
+    original = asarray(arr, dtype='d')
+    if types is None:
+        types = quantizeTypes[kind]
+    if maxError is None:
+        maxError = defaultErrorBounds[kind]
+
+    normalized = kind in ('normal', 'color')
+    if not normalized and original.ndim > 1 and original.shape[-1] > 3:
+        types = [t for t in types if numpy.dtype(t).kind == 'f']
+        if not types:
+            raise ValueError("%s data with %d components can only be stored as floats" % (kind, original.shape[-1]))
+    if kind in ('vertex', 'texture_coord') and original.size:
+        extent = float((original.max(0) - original.min(0)).max())
+        errorLimit = maxError * max(extent, 1e-30)
+    else: errorLimit = maxError
+
+    for typecode in types:
+        if numpy.dtype(typecode).kind == 'f':
+            result = QuantizedArray(kind, original.astype(typecode), originalBytes)
+        elif normalized:
+            result = QuantizedArray(kind, _encodeNormalized(original, typecode), originalBytes)
+            result.normalized = True
+        else:
+            data, scale, bias = _encodeScaled(original, typecode)
+            result = QuantizedArray(kind, data, originalBytes)
+            result.scale = scale
+            result.bias = bias
+
+        if result.measure(original) <= errorLimit:
+            break
+    return result
+
+def quantizeNormals(normals, maxError=None):
+    return quantize('normal', normals, maxError)
+def quantizeColors(colors, maxError=None):
+    return quantize('color', colors, maxError)
+def quantizeTexCoords(texcoords, maxError=None):
+    return quantize('texture_coord', texcoords, maxError)
+def quantizePositions(positions, maxError=None):
+    return quantize('vertex', positions, maxError)
+
+def quantizeAttributes(attrs, errorBounds=None):
+    """Quantizes a dict of kind to array.  Returns (quantized, report),
+    where report totals the bytes saved and lists each kind's errors."""
+    errorBounds = errorBounds or {}
+    quantized = {}
+    for kind, arr in attrs.iteritems():
+        quantized[kind] = quantize(kind, arr, errorBounds.get(kind))
+
+    entries = [q.report() for q in quantized.itervalues()]
+    originalBytes = sum(e['originalBytes'] for e in entries)
+    quantizedBytes = sum(e['bytes'] for e in entries)
+    report = dict(
+        originalBytes=originalBytes,
+        bytes=quantizedBytes,
+        ratio=originalBytes / float(max(quantizedBytes, 1)),
+        attributes=entries)
+    return quantized, report
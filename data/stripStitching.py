@@ -0,0 +1,144 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from functools import partial
+
+import numpy
+from numpy import asarray, concatenate
+
+from .. import hasGLExtension
+from ..raw import gl, glext
+from .arrayViews import _glCallAll
+from .drawArrayViews import DrawElementArrayView, drawModes
+from .meshOptimize import joinStrips
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+_stripModes = set([
+    gl.GL_LINE_STRIP, gl.GL_LINE_LOOP, gl.GL_TRIANGLE_STRIP,
+    gl.GL_TRIANGLE_FAN, gl.GL_QUAD_STRIP])
+
+def hasPrimitiveRestart():
+    return hasGLExtension('GL_NV_primitive_restart')
+
+def stripsFromVertexArrays(arrays):
+    """Concatenates per-strip vertex arrays.  Returns (vertices, strips),
+    with strips as index arrays into vertices."""
+    arrays = [asarray(a) for a in arrays]
+    counts = numpy.asarray([len(a) for a in arrays])
+    bases = numpy.cumsum(counts) - counts
+    strips = [numpy.arange(b, b + c) for b, c in zip(bases, counts)]
+    return concatenate(arrays), strips
+
+def restartIndices(strips, restartIndex):
+    """Joins strips with restartIndex between each"""
+    parts = []
+    sep = asarray([restartIndex])
+    for strip in strips:
+        if parts:
+            parts.append(sep)
+        parts.append(asarray(strip).ravel())
+    if not parts:
+        return numpy.zeros(0, 'I')
+    return concatenate(parts)
+
+def _linePairs(strip, closed=False):
+    strip = asarray(strip).ravel()
+    if closed and len(strip) > 2:
+        strip = concatenate([strip, strip[:1]])
+    return numpy.column_stack([strip[:-1], strip[1:]]).ravel()
+
+def _fanTriangles(strip):
+    strip = asarray(strip).ravel()
+    center = numpy.repeat(strip[:1], max(len(strip) - 2, 0))
+    return numpy.column_stack([center, strip[1:-1], strip[2:]]).ravel()
+
+def _quadStripQuads(strip):
+    strip = asarray(strip).ravel()
+    k = numpy.arange(0, len(strip) - 3, 2)
+    return numpy.column_stack([strip[k], strip[k+1], strip[k+3], strip[k+2]]).ravel()
+
+def stitchWithoutRestart(glid_mode, strips):
+    """Returns (glid_mode, indices) drawing every strip in one call without
+    primitive restart.  Triangle strips are joined with degenerate
+    triangles; the other strip modes are expanded to their independent
+    primitive equivalents."""
+    strips = [asarray(s).ravel() for s in strips]
+    strips = [s for s in strips if len(s)]
+    if glid_mode == gl.GL_TRIANGLE_STRIP:
+        return glid_mode, asarray(joinStrips([s.tolist() for s in strips]), 'I')
+    elif glid_mode == gl.GL_LINE_STRIP:
+        parts, glid_mode = [_linePairs(s) for s in strips], gl.GL_LINES
+    elif glid_mode == gl.GL_LINE_LOOP:
+        parts, glid_mode = [_linePairs(s, True) for s in strips], gl.GL_LINES
+    elif glid_mode == gl.GL_TRIANGLE_FAN:
+        parts, glid_mode = [_fanTriangles(s) for s in strips], gl.GL_TRIANGLES
+    elif glid_mode == gl.GL_QUAD_STRIP:
+        parts, glid_mode = [_quadStripQuads(s) for s in strips], gl.GL_QUADS
+    else:
+        parts = strips
+    if not parts:
+        return glid_mode, numpy.zeros(0, 'I')
+    return glid_mode, concatenate(parts)
+
+class StitchedStripView(object):
+    """Draws many strips of one mode with a single DrawElementArrayView.
+
+    Uses NV_primitive_restart when available, with the largest value of
+    the index type as the restart index; otherwise falls back to
+    stitchWithoutRestart."""
+
+    drawModes = drawModes
+    restart = False
+    restartIndex = None
+
+    def __init__(self, mode=None, strips=None, restart=None):
+        self.elements = DrawElementArrayView()
+        if strips is not None:
+            self.bind(mode, strips, restart)
+
+    def bind(self, mode, strips, restart=None):
+        """restart of None uses primitive restart when the driver has it"""
+        glid_mode = self.drawModes.get(mode, mode)
+        strips = list(strips)
+        if restart is None:
+            restart = hasPrimitiveRestart()
+        restart = bool(restart) and glid_mode in _stripModes
+
+        self.restart = restart
+        if restart:
+            maxIndex = max([int(asarray(s).max()) for s in strips if len(s)] or [0])
+            if maxIndex < 0xffff:
+                typecode = 'H'
+            else: typecode = 'I'
+            self.restartIndex = numpy.iinfo(typecode).max
+            indices = restartIndices(strips, self.restartIndex).astype(typecode)
+            self.elements.bind(glid_mode, indices, narrow=False)
+            self._glsend = _glCallAll([
+                partial(gl.glEnableClientState, glext.GL_PRIMITIVE_RESTART_NV),
+                partial(glext.glPrimitiveRestartIndexNV, self.restartIndex),
+                self.elements._glgroup,
+                partial(gl.glDisableClientState, glext.GL_PRIMITIVE_RESTART_NV)])
+        else:
+            self.restartIndex = None
+            glid_mode, indices = stitchWithoutRestart(glid_mode, strips)
+            self.elements.bind(glid_mode, indices)
+            self._glsend = self.elements._glgroup
+        return self
+
+    def send(self):
+        self._glsend()
+
+    def _glNoOP(self): pass
+    _glsend = _glNoOP
@@ -21,6 +21,7 @@ from TG.geomath.data.box import Box
 
 from ..raw import gl, glext
 from ..raw import errors as glErrors
+from .memoryRegistry import memoryRegistry, mipChainBytes
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Definitions 
@@ -554,13 +555,18 @@ class Texture(object):
             if not target:
                 target = self.setTarget()
 
-            texture_id = gl.GLenum(0)
-            gl.glGenTextures(1, byref(texture_id))
+            pool = self.namePool
+            if pool is not None:
+                name, storageKey = pool.acquire()
+                texture_id = self._pooledTextureId(pool, name, storageKey)
+            else:
+                texture_id = gl.GLenum(0)
+                gl.glGenTextures(1, byref(texture_id))
 
-            def delGLTexture(wr, texture_id=texture_id.value):
-                texture_id = gl.GLenum(texture_id)
-                gl.glDeleteTextures(1, byref(texture_id))
-            texture_id.wr = weakref.ref(texture_id, delGLTexture)
+                def delGLTexture(wr, texture_id=texture_id.value):
+                    texture_id = gl.GLenum(texture_id)
+                    gl.glDeleteTextures(1, byref(texture_id))
+                texture_id.wr = weakref.ref(texture_id, delGLTexture)
 
             self.texture_id = texture_id
             self.set(self.texParams)
@@ -570,10 +576,75 @@ class Texture(object):
 
     def _delTextureInfo(self):
         self.texture_id = None
+        self._levelBytes = None
+        memoryRegistry.untrack(self)
+
+    owner = None # tag reported by memoryRegistry
+    _levelBytes = None
+    def _trackImage(self, data, level):
+        levelBytes = self._levelBytes
+        if levelBytes is None:
+            levelBytes = self._levelBytes = {}
+        levelBytes[level] = data.getSizeInBytes()
+
+        if levelBytes.keys() == [0] and self._hasGeneratedMipmaps():
+            nbytes = mipChainBytes(data.size, data.getDataTypeSize())
+        else: nbytes = sum(levelBytes.itervalues())
+        memoryRegistry.track(self, 'texture', nbytes, self.target, self.owner or self.__class__.__name__)
+
+    def _hasGeneratedMipmaps(self):
+        # texPostParams are set after texParams, so the last setting wins
+        result = False
+        for params in (self.texParams, self.texPostParams):
+            if isinstance(params, dict):
+                params = params.iteritems()
+            for n, v in params:
+                if n == 'genMipmaps':
+                    result = bool(v)
+        return result
+
+    namePool = None # NamePool to recycle names and storage through; see namePools
+    def _pooledTextureId(self, pool, name, storageKey):
+        texture_id = gl.GLenum(name)
+        texture_id.storageKey = [storageKey]
+
+        def recycleGLTexture(wr, name=name, storageKey=texture_id.storageKey):
+            pool.recycle(name, storageKey[0])
+        texture_id.wr = weakref.ref(texture_id, recycleGLTexture)
+        return texture_id
+
+    def _pooledStorage(self, data, level):
+        """With a namePool, returns True when the bound texture already has
+        level 0 storage matching data, adopting an idle pooled name that
+        does if needed, so the image can be sent with glTexSubImage."""
+        pool = self.namePool
+        if pool is None or level != 0 or not data.ptr:
+            return False
+
+        storageKey = getattr(self.texture_id, 'storageKey', None)
+        if storageKey is None:
+            # name was generated before namePool was set; upload unpooled
+            return False
+
+        key = (self.target, self.format, tuple(data.size), data.border)
+        if storageKey[0] == key:
+            return True
+
+        name, found = pool.acquire(key, exact=True)
+        if name is None:
+            storageKey[0] = key
+            return False
+
+        self.texture_id = self._pooledTextureId(pool, name, found)
+        gl.glBindTexture(self.target, self.texture_id)
+        self.set(self.texParams)
+        self.set(self.texPostParams)
+        return True
 
     def bind(self):
         target, texture_id = self._getTextureInfo()
         gl.glBindTexture(target, texture_id)
+        memoryRegistry.touch(self)
     def unbind(self):
         target = self.target
         if target:
@@ -721,10 +792,16 @@ class Texture(object):
         self.bind(); data.select()
         try:
             texSize = data.size
-            gl.glTexImage1D(self.target, level, self.format, 
-                    texSize[0], data.border, 
-                    data.format, data.dataType, data.ptr)
+            if self._pooledStorage(data, level):
+                gl.glTexSubImage1D(self.target, level, 0, 
+                        texSize[0], 
+                        data.format, data.dataType, data.ptr)
+            else:
+                gl.glTexImage1D(self.target, level, self.format, 
+                        texSize[0], data.border, 
+                        data.format, data.dataType, data.ptr)
             self.texSize = texSize.copy()
+            self._trackImage(data, level)
         finally:
             data.deselect()
         return data
@@ -732,11 +809,17 @@ class Texture(object):
         self.bind(); data.select()
         try:
             texSize = data.size
-            gl.glTexImage2D(self.target, level, self.format, 
-                    texSize[0], texSize[1], data.border, 
-                    data.format, data.dataType, data.ptr)
+            if self._pooledStorage(data, level):
+                gl.glTexSubImage2D(self.target, level, 0, 0, 
+                        texSize[0], texSize[1], 
+                        data.format, data.dataType, data.ptr)
+            else:
+                gl.glTexImage2D(self.target, level, self.format, 
+                        texSize[0], texSize[1], data.border, 
+                        data.format, data.dataType, data.ptr)
 
             self.texSize = texSize.copy()
+            self._trackImage(data, level)
         finally:
             data.deselect()
         return data
@@ -744,10 +827,16 @@ class Texture(object):
         self.bind(); data.select()
         try:
             texSize = data.size
-            gl.glTexImage3D(self.target, level, self.format, 
-                    texSize[0], texSize[1], texSize[2], data.border, 
-                    data.format, data.dataType, data.ptr)
+            if self._pooledStorage(data, level):
+                gl.glTexSubImage3D(self.target, level, 0, 0, 0, 
+                        texSize[0], texSize[1], texSize[2], 
+                        data.format, data.dataType, data.ptr)
+            else:
+                gl.glTexImage3D(self.target, level, self.format, 
+                        texSize[0], texSize[1], texSize[2], data.border, 
+                        data.format, data.dataType, data.ptr)
             self.texSize = texSize.copy()
+            self._trackImage(data, level)
         finally:
             data.deselect()
         return data
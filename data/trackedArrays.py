@@ -0,0 +1,148 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import numpy
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def mergeIntervals(starts, stops, gap=0):
+    """Sorts and merges [start, stop) intervals, also joining intervals
+    separated by no more than gap.  Returns (starts, stops) arrays."""
+    starts = numpy.asarray(starts, dtype=numpy.intp)
+    stops = numpy.asarray(stops, dtype=numpy.intp)
+    if not len(starts):
+        return starts, stops
+    order = numpy.argsort(starts, kind='mergesort')
+    starts = starts[order]
+    stops = numpy.maximum.accumulate(stops[order])
+
+    newGroup = numpy.ones(len(starts), bool)
+    newGroup[1:] = starts[1:] > stops[:-1] + gap
+    groupStarts = numpy.flatnonzero(newGroup)
+    groupEnds = numpy.append(groupStarts[1:], len(starts)) - 1
+    return starts[groupStarts], stops[groupEnds]
+
+class TrackedArray(object):
+    """A numpy array mirrored in a BufferBase, recording which rows change
+    so flush sends only those spans with sendDataAt.
+
+    Writes through __setitem__ are tracked; after writing through other
+    views of data, call mark.  Dirty spans closer than mergeGap bytes are
+    sent as one call, trading a few extra bytes for fewer calls."""
+
+    mergeGap = 4096
+
+    def __init__(self, buffer, data, mergeGap=None, upload=True):
+        self.buffer = buffer
+        self.data = numpy.ascontiguousarray(data)
+        if mergeGap is not None:
+            self.mergeGap = mergeGap
+        self._rowBytes = self.data.strides[0] if self.data.ndim else self.data.itemsize
+        self._bytes = self.data.reshape(-1).view(numpy.ubyte)
+        self._dirtyStarts = []
+        self._dirtyStops = []
+        self.resetStats()
+        if upload:
+            self.upload()
+
+    def __len__(self):
+        return len(self.data)
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.markKey(key)
+
+    def upload(self):
+        """Sends the whole array and clears the dirty spans"""
+        buffer = self.buffer
+        buffer.bind()
+        buffer.sendData(self.data)
+        buffer.unbind()
+        self.clear()
+
+    def mark(self, start=0, stop=None):
+        """Marks rows [start, stop) as modified"""
+        if stop is None:
+            stop = len(self.data)
+        if stop > start:
+            self._dirtyStarts.append(start)
+            self._dirtyStops.append(stop)
+
+    def markKey(self, key):
+        """Marks the rows an index expression key touches"""
+        if isinstance(key, tuple):
+            key = key[0] if key else Ellipsis
+        count = len(self.data)
+
+        if isinstance(key, slice):
+            start, stop, step = key.indices(count)
+            if step < 0:
+                start, stop = stop + 1, start + 1
+            self.mark(start, stop)
+        elif key is Ellipsis or key is None:
+            self.mark(0, count)
+        elif isinstance(key, (int, long, numpy.integer)):
+            if key < 0:
+                key += count
+            self.mark(key, key + 1)
+        else:
+            rows = numpy.asarray(key)
+            if rows.dtype == bool:
+                # an N-D mask marks each row holding any selected element
+                rows = numpy.flatnonzero(rows.reshape(len(rows), -1).any(1))
+            rows = numpy.unique(rows % count)
+            if len(rows):
+                # mark runs of consecutive rows
+                breaks = numpy.flatnonzero(numpy.diff(rows) != 1) + 1
+                self._dirtyStarts.extend(rows[numpy.append(0, breaks)])
+                self._dirtyStops.extend(rows[numpy.append(breaks - 1, len(rows) - 1)] + 1)
+
+    def clear(self):
+        self._dirtyStarts = []
+        self._dirtyStops = []
+
+    def isDirty(self):
+        return bool(self._dirtyStarts)
+
+    def dirtyByteRanges(self):
+        """Returns merged (starts, stops) byte ranges awaiting flush"""
+        rowBytes = self._rowBytes
+        starts = numpy.asarray(self._dirtyStarts, numpy.intp) * rowBytes
+        stops = numpy.asarray(self._dirtyStops, numpy.intp) * rowBytes
+        return mergeIntervals(starts, stops, self.mergeGap)
+
+    def flush(self):
+        """Sends every dirty span; returns the number of sendDataAt calls"""
+        if not self._dirtyStarts:
+            return 0
+        starts, stops = self.dirtyByteRanges()
+        buffer = self.buffer
+        raw = self._bytes
+        buffer.bind()
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            buffer.sendDataAt(raw[start:stop], start)
+        buffer.unbind()
+        self.clear()
+
+        self.flushCount += 1
+        self.callCount += len(starts)
+        self.bytesSent += int((stops - starts).sum())
+        return len(starts)
+
+    def resetStats(self):
+        self.flushCount = 0
+        self.callCount = 0
+        self.bytesSent = 0
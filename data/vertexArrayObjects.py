@@ -0,0 +1,133 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+from functools import partial
+from ctypes import byref
+
+from .. import hasGLExtension
+from ..raw import gl, glext
+from .arrayViews import _glCallAll
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+_vaoApis = [
+    ('GL_ARB_vertex_array_object',
+        ('glGenVertexArrays', 'glBindVertexArray', 'glDeleteVertexArrays')),
+    ('GL_APPLE_vertex_array_object',
+        ('glGenVertexArraysAPPLE', 'glBindVertexArrayAPPLE', 'glDeleteVertexArraysAPPLE')),
+    ]
+
+def vaoApi():
+    """Returns (glGen, glBind, glDelete) for the best supported vertex
+    array object extension, or None"""
+    for ext, names in _vaoApis:
+        if hasGLExtension(ext):
+            return tuple(getattr(glext, n) for n in names)
+    return None
+
+class VertexArrayObject(object):
+    """Captures the client array state of a set of array views, and
+    optionally the element draw, so a mesh is selected with one call.
+
+    Uses a vertex array object when the driver offers one; otherwise the
+    views' enable and send calls are precompiled into a flat sequence
+    with the no-op calls stripped out."""
+
+    _as_parameter_ = None
+    _glapi = None
+    elements = None
+
+    def __init__(self, views=(), elements=None):
+        self.views = list(views)
+        self.elements = elements
+        if self.views:
+            self.capture()
+
+    def __del__(self):
+        self.release()
+
+    def capture(self, views=None, elements=None):
+        if views is not None:
+            self.views = list(views)
+        if elements is not None:
+            self.elements = elements
+
+        self.release()
+        self._glapi = vaoApi()
+        if self._glapi is not None:
+            self._captureVAO()
+        else:
+            self._captureCalls()
+
+        if self.elements is not None:
+            self._gldraw = self.elements._glgroup
+        else: self._gldraw = self._glNoOP
+        return self
+
+    def _captureVAO(self):
+        glGen, glBind, glDelete = self._glapi
+        p = gl.GLuint(0)
+        glGen(1, byref(p))
+        self._as_parameter_ = p
+
+        glBind(p)
+        for view in self.views:
+            view.enable()
+            view.send()
+        glBind(0)
+
+        self._glselect = partial(glBind, p)
+        self._gldeselect = partial(glBind, 0)
+
+    def _captureCalls(self):
+        select = []
+        deselect = []
+        for view in self.views:
+            for call in (view._glenable, view._glsend):
+                if call != view._glNoOP:
+                    select.append(call)
+            if view._gldisable != view._glNoOP:
+                deselect.append(view._gldisable)
+
+        self._glselect = _glCallAll(select)
+        self._gldeselect = _glCallAll(deselect)
+
+    def release(self):
+        p = self._as_parameter_
+        if p is not None:
+            glDelete = self._glapi[2]
+            glDelete(1, byref(p))
+            self._as_parameter_ = None
+        self._glselect = self._glNoOP
+        self._gldeselect = self._glNoOP
+
+    def isNative(self):
+        return self._as_parameter_ is not None
+
+    def select(self):
+        self._glselect()
+    def deselect(self):
+        self._gldeselect()
+    def send(self):
+        self._gldraw()
+
+    def draw(self):
+        self._glselect()
+        self._gldraw()
+        self._gldeselect()
+
+    def _glNoOP(self): pass
+    _glselect = _glNoOP
+    _gldeselect = _glNoOP
+    _gldraw = _glNoOP
@@ -0,0 +1,234 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+import struct
+
+import numpy
+
+from .arrayViews import arrayView
+from .drawArrayViews import DrawElementArrayView
+from .bufferObjects import ArrayBuffer, ElementArrayBuffer
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Constants / Variiables / Etc.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# A vertex file is a header, one record per attribute, then each
+# attribute's rows, C contiguous, starting at their record's offset.  kind
+# is an arrayView kind; name is the attribute name of a 'vertex_attrib' or
+# the draw mode of 'draw_elements'.  components of 1 means scalar rows, and
+# flags bit 0 is the vertex_attrib normalized flag.
+#
+#   header: magic, version, attribute count, header bytes, reserved
+#   record: kind, name, dtype.str, components, flags, count, offset
+
+vertexFileMagic = 'TGVF'
+vertexFileVersion = 1
+headerFormat = struct.Struct('<4sHHII')
+nameBytes = 24 # longest kind or name a record holds
+attributeFormat = struct.Struct('<%ds%ds8sIIQQ' % (nameBytes, nameBytes))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class VertexFileError(Exception):
+    pass
+
+class VertexAttribute(object):
+    def __init__(self, kind, dtype, shape, offset=0, name='', normalized=False):
+        self.kind = kind
+        self.dtype = numpy.dtype(dtype)
+        self.shape = tuple(shape)
+        self.offset = offset
+        self.name = name
+        self.normalized = normalized
+
+    def __repr__(self):
+        return '<%s %s%s %s%r @%d>' % (self.__class__.__name__, self.kind,
+                self.name and ':'+self.name or '', self.dtype.str, self.shape, self.offset)
+
+    def getCount(self):
+        return self.shape[0]
+    count = property(getCount)
+
+    def getComponents(self):
+        if len(self.shape) >= 2:
+            return self.shape[1]
+        return 1
+    components = property(getComponents)
+
+    def getNBytes(self):
+        nbytes = self.dtype.itemsize
+        for e in self.shape:
+            nbytes *= e
+        return nbytes
+    nbytes = property(getNBytes)
+
+    def pack(self):
+        flags = self.normalized and 1 or 0
+        return attributeFormat.pack(self.kind, self.name, self.dtype.str,
+                self.components, flags, self.count, self.offset)
+
+    @classmethod
+    def unpack(klass, raw):
+        kind, name, dtype, components, flags, count, offset = attributeFormat.unpack(raw)
+        if components == 1:
+            shape = (count,)
+        else: shape = (count, components)
+        return klass(kind.rstrip('\0'), dtype.rstrip('\0'), shape, offset,
+                name.rstrip('\0'), bool(flags & 1))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def writeVertexFile(path, attributes, alignment=16, chunkBytes=4<<20):
+    """Writes attributes, a sequence of (kind, data), (kind, data, name) or
+    (kind, data, name, normalized) tuples, to path.  data may itself be a
+    numpy.memmap; it is written a chunk at a time.  Returns the
+    VertexAttribute records written."""
+    entries = []
+    offset = headerFormat.size + attributeFormat.size*len(attributes)
+    for entry in attributes:
+        kind, data = entry[:2]
+        name = len(entry) > 2 and entry[2] or ''
+        normalized = len(entry) > 3 and entry[3]
+        for field in (kind, name):
+            if len(field) > nameBytes:
+                raise VertexFileError("Attribute %r is longer than the %d bytes a vertex file holds" % (field, nameBytes))
+        data = numpy.asanyarray(data)
+        if data.ndim not in (1, 2):
+            raise VertexFileError("Attribute %r must be 1 or 2 dimensional, not %r" % (kind, data.shape))
+        offset += -offset % alignment
+        attr = VertexAttribute(kind, data.dtype, data.shape, offset, name, normalized)
+        entries.append((attr, data))
+        offset += attr.nbytes
+
+    headerBytes = headerFormat.size + attributeFormat.size*len(entries)
+    f = open(path, 'wb')
+    try:
+        f.write(headerFormat.pack(vertexFileMagic, vertexFileVersion, len(entries), headerBytes, 0))
+        for attr, data in entries:
+            f.write(attr.pack())
+        for attr, data in entries:
+            f.write('\0' * (attr.offset - f.tell()))
+            rows = max(1, chunkBytes // max(1, attr.nbytes // max(1, attr.count)))
+            for start in xrange(0, attr.count, rows):
+                numpy.ascontiguousarray(data[start:start+rows]).tofile(f)
+    finally:
+        f.close()
+    return [attr for attr, data in entries]
+
+class VertexFile(object):
+    """A vertex file opened for mapping.  array returns a read-only
+    numpy.memmap of an attribute; upload streams it into a buffer object
+    in chunks and bindView binds an arrayView to that buffer, so the file
+    contents never need to be wholly in memory."""
+
+    chunkBytes = 4 << 20
+
+    def __init__(self, path):
+        self.path = path
+        f = open(path, 'rb')
+        try:
+            raw = f.read(headerFormat.size)
+            if len(raw) < headerFormat.size:
+                raise VertexFileError("%r is too short for a vertex file" % (path,))
+            magic, version, attrCount, headerBytes, reserved = headerFormat.unpack(raw)
+            if magic != vertexFileMagic:
+                raise VertexFileError("%r is not a vertex file" % (path,))
+            if version > vertexFileVersion:
+                raise VertexFileError("%r is vertex file version %d; only %d is supported" % (path, version, vertexFileVersion))
+            if headerBytes != headerFormat.size + attributeFormat.size*attrCount:
+                raise VertexFileError("%r has a header of %d bytes for %d attributes" % (path, headerBytes, attrCount))
+            raw = f.read(attributeFormat.size*attrCount)
+            if len(raw) != attributeFormat.size*attrCount:
+                raise VertexFileError("%r is truncated in its attribute records" % (path,))
+            fileBytes = os.fstat(f.fileno()).st_size
+        finally:
+            f.close()
+
+        size = attributeFormat.size
+        attributes = []
+        for i in xrange(0, len(raw), size):
+            try:
+                attr = VertexAttribute.unpack(raw[i:i+size])
+            except TypeError:
+                raise VertexFileError("%r has an attribute with an invalid dtype" % (path,))
+            if attr.offset < headerBytes or attr.offset + attr.nbytes > fileBytes:
+                raise VertexFileError("%r attribute %r lies outside the file's %d data bytes" % (path, attr, fileBytes))
+            attributes.append(attr)
+        self.attributes = attributes
+
+    def __iter__(self):
+        return iter(self.attributes)
+
+    def find(self, kind, name=None):
+        for attr in self.attributes:
+            if attr.kind == kind and (name is None or attr.name == name):
+                return attr
+        raise KeyError((kind, name))
+
+    def _attr(self, attr):
+        if isinstance(attr, basestring):
+            attr = self.find(attr)
+        return attr
+
+    def array(self, attr):
+        """Read-only numpy.memmap of attr, a VertexAttribute or kind"""
+        attr = self._attr(attr)
+        return numpy.memmap(self.path, attr.dtype, 'r', attr.offset, attr.shape)
+
+    def upload(self, attr, buffer=None, usage=None, progress=None):
+        """Sends attr into buffer, by default a new ArrayBuffer or, for
+        'draw_elements', ElementArrayBuffer.  Returns the buffer."""
+        attr = self._attr(attr)
+        if buffer is None:
+            if attr.kind == DrawElementArrayView.kind:
+                buffer = ElementArrayBuffer()
+            else: buffer = ArrayBuffer()
+        else: buffer.bind()
+        buffer.sendDataChunked(self.array(attr), usage, self.chunkBytes, progress)
+        buffer.unbind()
+        return buffer
+
+    def bindView(self, attr, buffer, view=None, program=None):
+        """Binds view, by default a new arrayView of attr's kind, to attr
+        in buffer.  program is used to locate vertex_attrib views by name."""
+        attr = self._attr(attr)
+        if view is None:
+            view = arrayView(attr.kind)
+
+        if attr.kind == DrawElementArrayView.kind:
+            view.bindBuffer(attr.name or 'tris', buffer, 0, attr.dtype, attr.shape)
+        elif attr.kind == 'vertex_attrib':
+            if program is not None:
+                view.locate(program, attr.name)
+            view.bindBuffer(buffer, 0, attr.dtype, attr.shape, normalized=attr.normalized)
+        else:
+            view.bindBuffer(buffer, 0, attr.dtype, attr.shape)
+        return view
+
+    def load(self, program=None, usage=None, progress=None):
+        """Uploads and binds every attribute; returns [(attr, buffer, view)].
+        progress is called with (sentBytes, totalBytes) over all of them."""
+        total = sum(attr.nbytes for attr in self.attributes)
+        done = [0]
+        def attrProgress(sent, attrTotal):
+            progress(done[0] + sent, total)
+
+        result = []
+        for attr in self.attributes:
+            buffer = self.upload(attr, None, usage, progress and attrProgress)
+            done[0] += attr.nbytes
+            result.append((attr, buffer, self.bindView(attr, buffer, None, program)))
+        return result
@@ -12497,3 +12497,154 @@ if 1: # ifndef GL_GREMEDY_string_marker ("inc/OpenGL/glext.h":6482)
 #~   "inc/OpenGL/glext.h"
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Extensions newer than the bundled glext.h
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if 1: # ifndef GL_ARB_vertex_array_object
+    """GL_ARB_vertex_array_object"""
+    GL_ARB_vertex_array_object = 1
+    GL_VERTEX_ARRAY_BINDING = 0x85B5
+    
+    @bind(None, [GLuint])
+    def glBindVertexArray(array, _api_=None): 
+        """glBindVertexArray(array)
+        
+            array : GLuint
+        """
+        return _api_(array)
+        
+    @bind(None, [GLsizei, POINTER(GLuint)])
+    def glDeleteVertexArrays(n, arrays, _api_=None): 
+        """glDeleteVertexArrays(n, arrays)
+        
+            n : GLsizei
+            arrays : POINTER(GLuint)
+        """
+        return _api_(n, arrays)
+        
+    @bind(None, [GLsizei, POINTER(GLuint)])
+    def glGenVertexArrays(n, arrays, _api_=None): 
+        """glGenVertexArrays(n, arrays)
+        
+            n : GLsizei
+            arrays : POINTER(GLuint)
+        """
+        return _api_(n, arrays)
+        
+    @bind(GLboolean, [GLuint])
+    def glIsVertexArray(array, _api_=None): 
+        """glIsVertexArray(array)
+        
+            array : GLuint
+        """
+        return _api_(array)
+        
+    
+
+if 1: # ifndef GL_ARB_draw_instanced
+    """GL_ARB_draw_instanced"""
+    GL_ARB_draw_instanced = 1
+    
+    @bind(None, [GLenum, GLint, GLsizei, GLsizei])
+    def glDrawArraysInstancedARB(mode, first, count, primcount, _api_=None): 
+        """glDrawArraysInstancedARB(mode, first, count, primcount)
+        
+            mode : GLenum
+            first : GLint
+            count : GLsizei
+            primcount : GLsizei
+        """
+        return _api_(mode, first, count, primcount)
+        
+    @bind(None, [GLenum, GLsizei, GLenum, POINTER(GLvoid), GLsizei])
+    def glDrawElementsInstancedARB(mode, count, type, indices, primcount, _api_=None): 
+        """glDrawElementsInstancedARB(mode, count, type, indices, primcount)
+        
+            mode : GLenum
+            count : GLsizei
+            type : GLenum
+            indices : POINTER(GLvoid)
+            primcount : GLsizei
+        """
+        return _api_(mode, count, type, indices, primcount)
+        
+    
+
+if 1: # ifndef GL_ARB_instanced_arrays
+    """GL_ARB_instanced_arrays"""
+    GL_ARB_instanced_arrays = 1
+    GL_VERTEX_ATTRIB_ARRAY_DIVISOR_ARB = 0x88FE
+    
+    @bind(None, [GLuint, GLuint])
+    def glVertexAttribDivisorARB(index, divisor, _api_=None): 
+        """glVertexAttribDivisorARB(index, divisor)
+        
+            index : GLuint
+            divisor : GLuint
+        """
+        return _api_(index, divisor)
+        
+    
+
+if 1: # ifndef GL_ARB_map_buffer_range
+    """GL_ARB_map_buffer_range"""
+    GL_ARB_map_buffer_range = 1
+    GL_MAP_READ_BIT = 0x0001
+    GL_MAP_WRITE_BIT = 0x0002
+    GL_MAP_INVALIDATE_RANGE_BIT = 0x0004
+    GL_MAP_INVALIDATE_BUFFER_BIT = 0x0008
+    GL_MAP_FLUSH_EXPLICIT_BIT = 0x0010
+    GL_MAP_UNSYNCHRONIZED_BIT = 0x0020
+    
+    @bind(POINTER(GLvoid), [GLenum, GLintptr, GLsizeiptr, GLbitfield])
+    def glMapBufferRange(target, offset, length, access, _api_=None): 
+        """glMapBufferRange(target, offset, length, access)
+        
+            target : GLenum
+            offset : GLintptr
+            length : GLsizeiptr
+            access : GLbitfield
+        """
+        return _api_(target, offset, length, access)
+        
+    @bind(None, [GLenum, GLintptr, GLsizeiptr])
+    def glFlushMappedBufferRange(target, offset, length, _api_=None): 
+        """glFlushMappedBufferRange(target, offset, length)
+        
+            target : GLenum
+            offset : GLintptr
+            length : GLsizeiptr
+        """
+        return _api_(target, offset, length)
+        
+    
+
+if 1: # ifndef GL_APPLE_flush_buffer_range
+    """GL_APPLE_flush_buffer_range"""
+    GL_APPLE_flush_buffer_range = 1
+    GL_BUFFER_SERIALIZED_MODIFY_APPLE = 0x8A12
+    GL_BUFFER_FLUSHING_UNMAP_APPLE = 0x8A13
+    
+    @bind(None, [GLenum, GLenum, GLint])
+    def glBufferParameteriAPPLE(target, pname, param, _api_=None): 
+        """glBufferParameteriAPPLE(target, pname, param)
+        
+            target : GLenum
+            pname : GLenum
+            param : GLint
+        """
+        return _api_(target, pname, param)
+        
+    @bind(None, [GLenum, GLintptr, GLsizeiptr])
+    def glFlushMappedBufferRangeAPPLE(target, offset, size, _api_=None): 
+        """glFlushMappedBufferRangeAPPLE(target, offset, size)
+        
+            target : GLenum
+            offset : GLintptr
+            size : GLsizeiptr
+        """
+        return _api_(target, offset, size)
+        
+    
+
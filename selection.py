@@ -10,16 +10,69 @@
 #~ Imports 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+from __future__ import with_statement
+
+import sys
 import functools
 import itertools
 
+import numpy
+
+from . import hasGLExtension
 from .raw import gl, glu
+from .data.bufferObjects import PixelPackBuffer
+from .stackBlocks import glPixelStore
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Definitions 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+class PickFuture(object):
+    """Result of an asynchronous pick, resolved by a later Selector.poll()"""
+
+    done = False
+    result = None
+
+    def __init__(self, callback=None):
+        self._callbacks = []
+        if callback is not None:
+            self._callbacks.append(callback)
+
+    def addCallback(self, callback):
+        if self.done:
+            callback(self.result)
+        else: self._callbacks.append(callback)
+
+    def resolve(self, result):
+        self.result = result
+        self.done = True
+        callbacks = self._callbacks
+        self._callbacks = []
+        for callback in callbacks:
+            callback(result)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
 class Selector(object):
+    def select(self, render, *args, **kw):
+        self.start()
+        render(self)
+        return self.finish(*args, **kw)
+
+    def selectAsync(self, render, *args, **kw):
+        self.start()
+        render(self)
+        return self.finishAsync(*args, **kw)
+
+    def finishAsync(self, *args, **kw):
+        # default: the result is available immediately
+        future = PickFuture(kw.pop('callback', None))
+        future.resolve(self.finish(*args, **kw))
+        return future
+
+    def poll(self):
+        pass
+
     def start(self):
         raise NotImplementedError('Subclass Responsibility: %r' % (self,))
 
@@ -38,6 +91,14 @@ class Selector(object):
 class NameSelector(Selector):
     """Uses the builtin name-based geometry selection model provided by OpenGL"""
 
+    bufferGrowth = 4
+    maxBufferSize = 1<<22
+
+    # learned select buffer sizes, keyed by call site or explicit hintKey
+    _sizeHints = {}
+
+    overflowed = False
+
     def __init__(self, bufferSize=1024):
         Selector.__init__(self)
         self.setBufferSize(bufferSize)
@@ -60,14 +121,52 @@ class NameSelector(Selector):
 
     def finish(self, incZDepth=False):
         hitRecords = gl.glRenderMode(gl.GL_RENDER)
+        # glRenderMode returns -1 when the select buffer overflowed
+        self.overflowed = (hitRecords < 0)
         selection = self._processHits(hitRecords, self.getNamedItem, incZDepth)
         self._namedItems.clear()
         return selection
 
+    def select(self, render, incZDepth=False, hintKey=None):
+        """Runs start, render(self), finish -- re-rendering with a
+        geometrically grown select buffer until the hit records fit.  The
+        final buffer size is remembered per hintKey (default: the caller's
+        file and line) so later picks from the same site start big enough."""
+        if hintKey is None:
+            frame = sys._getframe(1)
+            hintKey = (frame.f_code.co_filename, frame.f_lineno)
+            del frame
+
+        sizeHint = self._sizeHints.get(hintKey, 0)
+        if sizeHint > self.bufferSize:
+            self.bufferSize = sizeHint
+
+        while 1:
+            self.start()
+            render(self)
+            selection = self.finish(incZDepth)
+            if not self.overflowed:
+                break
+
+            bufferSize = self.bufferSize
+            if bufferSize >= self.maxBufferSize:
+                print 'WARNING: select buffer overflowed at maximum size', bufferSize
+                break
+            self.bufferSize = min(bufferSize*self.bufferGrowth, self.maxBufferSize)
+
+        if self.bufferSize > sizeHint:
+            self._sizeHints[hintKey] = self.bufferSize
+        return selection
+
     def _processHits(self, hitRecords, getNamedItem, incZDepth=False):
         offset = 0
         buffer = self._buffer
         result = []
+        if hitRecords < 0:
+            # overflowed: the buffer was filled completely, so decode
+            # every record that fits
+            hitRecords = self._countCompleteHits(buffer)
+
         for hit in xrange(hitRecords):
             nameRecords, minZ, maxZ = buffer[offset:offset+3]
             names = list(buffer[offset+3:offset+3+nameRecords])
@@ -79,6 +178,16 @@ class NameSelector(Selector):
             result.append(namedHit)
         return result
 
+    def _countCompleteHits(self, buffer):
+        count = offset = 0
+        end = len(buffer)
+        while offset + 3 <= end:
+            offset += 3 + buffer[offset]
+            if offset > end:
+                break
+            count += 1
+        return count
+
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
     def getNamedItem(self, n):
@@ -113,32 +222,89 @@ class NameSelector(Selector):
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 class StencilSelector(Selector):
+    """Renders item ids into the stencil buffer and decodes the pick
+    rectangle.  Ids wider than the stencil buffer are rendered as several
+    bit-plane passes by select()"""
+
+    _isViable = None
+    stencilBits = 8
+    pickRect = ((0, 0), (0, 0))
+    overflowed = False
+    lastId = 0
+    _passShift = 0
+    _deferred = False
+
     def __init__(self):
         Selector.__init__(self)
         self._namedItems = {}
         self._nameStack = []
+        self._planes = []
+        self._pending = []
+        self._freePackBuffers = []
 
     @classmethod
     def checkViable(klass):
-        isViable = self._isViable
+        isViable = klass._isViable
         if isViable is not None:
             return isViable
 
         v = gl.GLint(0)
         gl.glGetIntegerv(gl.GL_STENCIL_BITS, gl.byref(v))
         v = v.value
-        isViable = (v < 8)
-        if not isViable:
-            print 'WARNING: need at least 8 stencil bits, only found', v
-            
+        isViable = (v > 0)
+        if isViable:
+            klass.stencilBits = min(v, 8)
+        else:
+            print 'WARNING: need stencil bits for stencil selection, found', v
+
+        klass._isViable = isViable
         return isViable
 
-    def start(self):
-        self._namedItems.clear()
+    _asyncViable = None
+    @classmethod
+    def checkAsyncViable(klass):
+        isViable = klass._asyncViable
+        if isViable is None:
+            isViable = hasGLExtension('GL_ARB_pixel_buffer_object', 'GL_EXT_pixel_buffer_object')
+            klass._asyncViable = isViable
+        return isViable
+
+    def select(self, render, incCoverage=False):
+        self._renderPasses(render, False)
+        return self.finish(incCoverage)
+
+    def selectAsync(self, render, incCoverage=False, callback=None):
+        self._renderPasses(render, True)
+        return self.finishAsync(incCoverage, callback)
+
+    def _renderPasses(self, render, deferred):
+        passIdx = 0
+        self.start(passIdx, deferred)
+        render(self)
+        while passIdx + 1 < self.passesFor(self.lastId):
+            self.finishPass()
+            passIdx += 1
+            self.start(passIdx, deferred)
+            render(self)
+
+    def passesFor(self, lastId):
+        passes = 1
+        while lastId >> (passes*self.stencilBits):
+            passes += 1
+        return passes
+
+    def start(self, passIdx=0, deferred=False):
+        if passIdx == 0:
+            self._namedItems.clear()
+            del self._planes[:]
         self._nameStack[:] = []
         self.nextId = itertools.count(0x1).next
+        self.lastId = 0
+        self._deferred = deferred
 
-        self._setCurrentName = functools.partial(gl.glStencilFunc, gl.GL_ALWAYS, mask=-1)
+        self._passShift = passIdx*self.stencilBits
+        self._passMask = (1 << self.stencilBits) - 1
+        self._setStencilRef = functools.partial(gl.glStencilFunc, gl.GL_ALWAYS, mask=-1)
 
         gl.glClearStencil(0)
         gl.glClear(gl.GL_STENCIL_BUFFER_BIT)
@@ -147,27 +313,171 @@ class StencilSelector(Selector):
         self._setCurrentName(0)
         gl.glEnable(gl.GL_STENCIL_TEST)
 
-    def finish(self):
-        sel = []
+    def finishPass(self):
         gl.glDisable(gl.GL_STENCIL_TEST)
 
         (x,y),(w,h) = self.pickRect
-        if x>0 and y>0:
-            vbuf = (gl.GLuint * max(1, w*h))(0)
-            gl.glReadPixels(int(x),int(y),int(w),int(h),
-                gl.GL_STENCIL_INDEX, gl.GL_UNSIGNED_INT, vbuf)
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        if x<0 or y<0 or w<=0 or h<=0:
+            self._planes.append(None)
+            return
+
+        # rows are read tightly packed; see _readStencil
+        rowStride = w
+        if self._deferred and self.checkAsyncViable():
+            pbo = self._packBufferFor(h*rowStride)
+            self._readStencil(x, y, w, h, None)
+            pbo.unbind()
+            self._planes.append((pbo, h, rowStride, w))
+        else:
+            plane = numpy.zeros((h, rowStride), 'B')
+            self._readStencil(x, y, w, h, plane.ctypes)
+            self._planes.append(plane)
+
+    def _readStencil(self, x, y, w, h, ptr):
+        # read with GL_PACK_ALIGNMENT of 1, whatever the application set
+        with glPixelStore(gl.GL_PACK_ALIGNMENT, 1):
+            gl.glReadPixels(x, y, w, h,
+                gl.GL_STENCIL_INDEX, gl.GL_UNSIGNED_BYTE, ptr)
+
+    def finishIds(self):
+        """Completes the current pass and returns the pick rectangle as a
+        2d array of item ids, with 0 where nothing was drawn"""
+        self.finishPass()
+        planes = [self._resolvePlane(plane) for plane in self._planes]
+        self.overflowed = bool(self.lastId >> (len(planes)*self.stencilBits))
+        return self._decodePlanes(planes)
+
+    def selectIds(self, render):
+        """Renders all passes and returns (ids, namedItems) for the pick
+        rectangle; see finishIds"""
+        self._renderPasses(render, False)
+        ids = self.finishIds()
+
+        namedItems = self._namedItems
+        self._namedItems = {}
+        self._nameStack[:] = []
+        del self._planes[:]
+        return ids, namedItems
 
-            sel = self._processHits(vbuf, self.getNamedItem)
+    def finish(self, incCoverage=False):
+        ids = self.finishIds()
+        sel = self._processHits(ids, self.getNamedItem, incCoverage)
 
         self._namedItems.clear()
         self._nameStack[:] = []
+        del self._planes[:]
         return sel
 
-    def _processHits(self, vbuf, getNamedItem):
+    #~ Asynchronous readback ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    asyncLatency = 1
+
+    def finishAsync(self, incCoverage=False, callback=None):
+        """Starts reading the pick rectangle into pixel pack buffers and
+        returns a PickFuture resolved by poll() asyncLatency frames later.
+        Without pixel buffer object support the read is synchronous and the
+        future is resolved immediately."""
+        future = PickFuture(callback)
+
+        self._deferred = True
+        self.finishPass()
+        planes = self._planes
+        self._planes = []
+        future.overflowed = bool(self.lastId >> (len(planes)*self.stencilBits))
+
+        # hand the name map to the pending read; the next start gets a new one
+        namedItems = self._namedItems
+        self._namedItems = {}
+        self._nameStack[:] = []
+
+        pending = [self.asyncLatency, planes, namedItems, incCoverage, future]
+        if [p for p in planes if isinstance(p, tuple)]:
+            self._pending.append(pending)
+        else: self._resolvePending(pending)
+        return future
+
+    def poll(self):
+        """Resolves pending asynchronous picks whose readback has had
+        asyncLatency frames to complete.  Call once per frame with the
+        context current."""
+        if not self._pending:
+            return 0
+
+        waiting = []
+        resolved = 0
+        for pending in self._pending:
+            pending[0] -= 1
+            if pending[0] > 0:
+                waiting.append(pending)
+            else:
+                self._resolvePending(pending)
+                resolved += 1
+        self._pending = waiting
+        return resolved
+
+    def _resolvePending(self, pending):
+        frames, planes, namedItems, incCoverage, future = pending
+        ids = self._decodePlanes([self._resolvePlane(plane) for plane in planes])
+        future.resolve(self._processHits(ids, namedItems.__getitem__, incCoverage))
+
+    def _packBufferFor(self, nbytes):
+        pool = self._freePackBuffers
+        for idx, pbo in enumerate(pool):
+            if pbo.nbytes >= nbytes:
+                del pool[idx]
+                pbo.bind()
+                return pbo
+
+        if pool:
+            pbo = pool.pop()
+            pbo.bind()
+        else: pbo = PixelPackBuffer()
+        pbo.allocate(nbytes)
+        return pbo
+
+    def _resolvePlane(self, plane):
+        if not isinstance(plane, tuple):
+            return plane
+
+        pbo, h, rowStride, w = plane
+        pbo.bind()
+        mapping = pbo.mapRange(0, h*rowStride, 'r', numpy.ubyte)
+        try:
+            data = mapping.map()
+            plane = data.reshape(h, rowStride)[:, :w].copy()
+        finally:
+            mapping.unmap()
+            pbo.unbind()
+        self._freePackBuffers.append(pbo)
+        return plane
+
+    def _decodePlanes(self, planes):
+        for plane in planes:
+            if plane is None:
+                return numpy.zeros((0, 0), 'I')
+
+        ids = planes[0].astype('I')
+        shift = self.stencilBits
+        for plane in planes[1:]:
+            ids |= plane.astype('I') << shift
+            shift += self.stencilBits
+        return ids
+
+    def _processHits(self, ids, getNamedItem, incCoverage=False):
+        ids = ids[ids != 0]
+        if not ids.size:
+            return []
+
+        names = numpy.unique(ids)
+        coverage = numpy.bincount(names.searchsorted(ids))
+
         r = []
-        for hit in vbuf:
-            if hit>0:
-                r.append([getNamedItem(hit)])
+        for n, count in zip(names.tolist(), coverage.tolist()):
+            namedHit = [getNamedItem(n)]
+            if incCoverage:
+                namedHit = (count, namedHit)
+            r.append(namedHit)
         return r
 
     def pickMatrix(self, pos, size, vpbox):
@@ -177,11 +487,19 @@ class StencilSelector(Selector):
         return self._namedItems[n]
     def addItems(self, items):
         n = self.nextId()
-        self._namedItems[n] = items
+        self.lastId = n
+        if not self._passShift:
+            # later passes replay the same id sequence
+            self._namedItems[n] = items
         return n
 
+    def _setCurrentName(self, n):
+        self._setStencilRef((n >> self._passShift) & self._passMask)
+
     def load(self, *items):
         n = self.addItems(items)
+        if self._nameStack:
+            self._nameStack[-1] = n
         self._setCurrentName(n)
 
     def push(self, *items):
@@ -190,6 +508,96 @@ class StencilSelector(Selector):
         self._setCurrentName(n)
 
     def pop(self):
-        n = self._nameStack.pop()
-        self._setCurrentName(n)
+        self._nameStack.pop()
+        if self._nameStack:
+            self._setCurrentName(self._nameStack[-1])
+        else: self._setCurrentName(0)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class PickCache(object):
+    """Answers point picks from the id tile read around the last cache
+    miss, for as long as the scene version is unchanged.  Bump the version
+    with invalidate(), or pass the scene's own counter to pick().  The
+    selector must read id tiles with selectIds, as StencilSelector does."""
+
+    tileSize = (32, 32)
+    sceneVersion = 0
+    hits = misses = 0
+
+    def __init__(self, selector=None, tileSize=None):
+        if selector is None:
+            selector = StencilSelector()
+        elif not hasattr(selector, 'selectIds'):
+            raise TypeError("PickCache needs a selector with selectIds, such as StencilSelector, not %r" % (selector,))
+        self.selector = selector
+        if tileSize is not None:
+            self.tileSize = tileSize
+        self._tile = None
+
+    def invalidate(self):
+        self.sceneVersion += 1
+        self._tile = None
+
+    def getHitRate(self):
+        total = self.hits + self.misses
+        if not total:
+            return 0.
+        return float(self.hits)/total
+    hitRate = property(getHitRate)
+
+    def resetStats(self):
+        self.hits = self.misses = 0
+
+    def pick(self, pos, render, vpbox=None, sceneVersion=None):
+        """Returns the selection at window position pos, re-rendering the
+        id tile around pos through render(selector) on a miss"""
+        if sceneVersion is None:
+            sceneVersion = self.sceneVersion
+        x, y = int(pos[0]), int(pos[1])
+
+        tile = self._tile
+        if tile is None or tile[0] != sceneVersion or not self._tileContains(tile, x, y):
+            if vpbox is None:
+                vpbox = self._viewport()
+            if not (vpbox[0] <= x < vpbox[0] + vpbox[2] and vpbox[1] <= y < vpbox[1] + vpbox[3]):
+                # nothing to pick outside the viewport
+                return []
+            self.misses += 1
+            tile = self._readTile(x, y, render, vpbox, sceneVersion)
+            self._tile = tile
+        else: self.hits += 1
+
+        version, (tx, ty), ids, namedItems = tile
+        if not self._tileContains(tile, x, y):
+            return []
+        n = int(ids[y - ty, x - tx])
+        if not n:
+            return []
+        return [[namedItems[n]]]
+
+    def _tileContains(self, tile, x, y):
+        version, (tx, ty), ids = tile[:3]
+        th, tw = ids.shape
+        return (tx <= x < tx + tw) and (ty <= y < ty + th)
+
+    def _viewport(self):
+        vpbox = (gl.GLint*4)()
+        gl.glGetIntegerv(gl.GL_VIEWPORT, vpbox)
+        return tuple(vpbox)
+
+    def _readTile(self, x, y, render, vpbox, sceneVersion):
+        tw, th = self.tileSize
+        x0, y0 = x - tw//2, y - th//2
+
+        # keep the tile inside the viewport
+        x0 = max(vpbox[0], min(x0, vpbox[0] + vpbox[2] - tw))
+        y0 = max(vpbox[1], min(y0, vpbox[1] + vpbox[3] - th))
+        tw = min(tw, vpbox[0] + vpbox[2] - x0)
+        th = min(th, vpbox[1] + vpbox[3] - y0)
+
+        selector = self.selector
+        selector.pickMatrix((x0, y0), (tw, th), vpbox)
+        ids, namedItems = selector.selectIds(render)
+        return (sceneVersion, (x0, y0), ids, namedItems)
 
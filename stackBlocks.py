@@ -44,6 +44,15 @@ def glGetValueFor(glid):
     gl.glGetIntegerv(glid, gl.byref(v))
     return v.value
 
+@contextmanager
+def glPixelStore(pname, value):
+    prev = glGetValueFor(pname)
+    gl.glPixelStorei(pname, value)
+    try:
+        yield
+    finally:
+        gl.glPixelStorei(pname, prev)
+
 def glPurgeNames():
     count = glGetValueFor(gl.GL_NAME_STACK_DEPTH)
     _glPurgeStackOf(gl.glPopName, count)
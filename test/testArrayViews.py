@@ -0,0 +1,43 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from numpy import zeros
+from TG.ext.openGL.data.arrayViews import arrayView
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class TestArrayViews(unittest.TestCase):
+    def testRebindIfChanged(self):
+        view = arrayView('vertex')
+        arr = zeros((4, 3), 'f')
+        self.assert_(view.rebindIfChanged(arr))
+        self.assert_(not view.rebindIfChanged(arr))
+        self.assert_(not view.rebindIfChanged(arr[:]))
+        self.assert_(view.rebindIfChanged(arr[::2]))
+
+        # resizing in place changes the layout of the same array object
+        arr = zeros((4, 3), 'f')
+        view.rebindIfChanged(arr)
+        arr.resize((2, 3), refcheck=False)
+        self.assert_(view.rebindIfChanged(arr))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,109 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from numpy import array, arange, identity
+from TG.ext.openGL.bvhSelection import BoundingVolumeHierarchy, BVHSelector
+from TG.ext.openGL.data.arrayViews import arrayView
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+quad = array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], 'f')
+
+class TestBVHSelection(unittest.TestCase):
+    def setUp(self):
+        self.bvh = BoundingVolumeHierarchy(leafSize=2)
+        self.bvh.register(('front',), quad, [0, 1, 2, 0, 2, 3], 'tris')
+        self.bvh.register(('back',), quad + [0, 0, -5], None, 'quads')
+        self.bvh.register(('line',), [[0, 0], [5, 5]], None, 'lines')
+
+    def testRayNearestFirst(self):
+        hits = self.bvh.queryRay([0.5, 0.25, 10], [0, 0, -1])
+        self.assertEqual([items for depth, items in hits], [('front',), ('back',)])
+        self.assertAlmostEqual(hits[0][0][0], 10.)
+        self.assertAlmostEqual(hits[1][0][0], 15.)
+
+    def testRayMiss(self):
+        self.assertEqual(self.bvh.queryRay([0.5, 0.25, 10], [0, 0, 1]), [])
+        self.assertEqual(self.bvh.queryRay([2.5, 0.25, 10], [0, 0, -1]), [])
+
+    def testPointNearLine(self):
+        hits = self.bvh.queryPoint([3, 3.05], 0.1)
+        self.assertEqual([items for depth, items in hits], [('line',)])
+
+    def testFrustum(self):
+        planes = array([
+            [1, 0, 0, -0.2], [-1, 0, 0, 0.8],
+            [0, 1, 0, -0.2], [0, -1, 0, 0.8],
+            [0, 0, -1, 2], [0, 0, 1, 2]], 'f')
+        hits = self.bvh.queryFrustum(planes)
+        self.assertEqual([items for depth, items in hits], [('front',), ('line',)])
+
+    def testUnregister(self):
+        key = self.bvh.register(('extra',), quad + [0, 0, 1], None, 'quads')
+        self.assertEqual(self.bvh.queryRay([0.5, 0.5, 10], [0, 0, -1])[0][1], ('extra',))
+        self.bvh.unregister(key)
+        self.assertEqual(self.bvh.queryRay([0.5, 0.5, 10], [0, 0, -1])[0][1], ('front',))
+
+    def testRegisterArrayView(self):
+        bvh = BoundingVolumeHierarchy()
+        view = arrayView('vertex')
+        view.bind(quad + [5, 0, 0])
+        bvh.register(('view',), view, [0, 1, 2, 0, 2, 3], 'tris')
+        self.assertEqual(bvh.queryRay([5.5, 0.5, 10], [0, 0, -1])[0][1], ('view',))
+        self.assertEqual(bvh.queryRay([0.5, 0.5, 10], [0, 0, -1]), [])
+
+    def testManyPrimitives(self):
+        bvh = BoundingVolumeHierarchy()
+        verts = array([(x, y, 0) for y in xrange(50) for x in xrange(50)], 'f')
+        idx = arange(2500).reshape(50, 50)
+        quads = array([idx[:-1,:-1], idx[:-1,1:], idx[1:,1:], idx[1:,:-1]]).transpose(1, 2, 0)
+        bvh.register(('grid',), verts, quads.ravel(), 'quads')
+        self.assertEqual(len(bvh.queryRay([10.3, 20.6, 5], [0, 0, -1])), 1)
+        self.assertEqual(len(bvh.queryRay([60.3, 20.6, 5], [0, 0, -1])), 0)
+
+    def testSelector(self):
+        selector = BVHSelector(self.bvh)
+        selector.setMatrices(identity(4).ravel(), identity(4).ravel())
+        selector.pickMatrix((75, 62.5), (1, 1), (0, 0, 100, 100))
+        self.assertEqual(selector.select(), [[('front',)]])
+
+        selector.pickMatrix((0, 0), (1, 1), (0, 0, 100, 100))
+        self.assertEqual(selector.select(), [])
+
+    def testSelectorPoint(self):
+        self.bvh.register(('point',), [[0.3, -0.5, 0]], None, 'points')
+        selector = BVHSelector(self.bvh)
+        selector.setMatrices(identity(4).ravel(), identity(4).ravel())
+        selector.pickMatrix((65.5, 25.5), (1, 1), (0, 0, 100, 100))
+        self.assertEqual(selector.select(), [[('point',)]])
+
+        selector.pickMatrix((70, 25), (1, 1), (0, 0, 100, 100))
+        self.assertEqual(selector.select(), [])
+
+    def testRayTolerance(self):
+        bvh = BoundingVolumeHierarchy()
+        bvh.register(('point',), [[0.5, 0, -1]], None, 'points')
+        self.assertEqual(bvh.queryRay([0, 0, 0], [0, 0, -2]), [])
+        self.assertEqual(len(bvh.queryRay([0, 0, 0], [0, 0, -2], (0., 1.))), 1)
+        self.assertEqual(bvh.queryRay([0, 0, 0], [0, 0, -2], (0., 0.8)), [])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,102 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+import numpy
+from TG.ext.openGL.data.bufferHeap import BuddyAllocator, BufferHeap
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class MemoryBuffer(object):
+    """Stands in for a GL buffer object, keeping its contents in memory"""
+    released = False
+
+    def bind(self): pass
+    def unbind(self): pass
+
+    def allocate(self, count):
+        self.data = numpy.zeros(count, numpy.ubyte)
+    def sendDataAt(self, data, offset=0):
+        raw = numpy.ascontiguousarray(data).view(numpy.ubyte).ravel()
+        self.data[offset:offset+len(raw)] = raw
+    def getDataAt(self, offset, nbytes, dtype=None):
+        result = self.data[offset:offset+nbytes].copy()
+        if dtype is not None:
+            result = result.view(dtype)
+        return result
+    def release(self):
+        self.released = True
+
+class TestBuddyAllocator(unittest.TestCase):
+    def testSplitAndCoalesce(self):
+        buddy = BuddyAllocator(1024, 64)
+        a = buddy.alloc(100)
+        b = buddy.alloc(64)
+        c = buddy.alloc(300)
+        self.assertEqual((a, b, c), (0, 128, 512))
+        self.assertEqual(buddy.blockSize(a), 128)
+
+        for offset in (a, b, c):
+            buddy.free(offset)
+        self.assert_(buddy.isEmpty())
+        self.assertEqual(buddy.freeLists[buddy.maxOrder], set([0]))
+
+    def testFull(self):
+        buddy = BuddyAllocator(256, 64)
+        self.assertEqual([buddy.alloc(64) for i in xrange(4)], [0, 64, 128, 192])
+        self.assertEqual(buddy.alloc(1), None)
+        self.assertEqual(buddy.alloc(512), None)
+
+class TestBufferHeap(unittest.TestCase):
+    def setUp(self):
+        self.heap = BufferHeap(1024, 64, MemoryBuffer)
+
+    def testArenas(self):
+        handles = [self.heap.write(numpy.arange(i, i+30, dtype='f')) for i in xrange(10)]
+        self.assertEqual(len(self.heap.arenas), 2)
+        self.assertEqual(handles[3].buffer.getDataAt(handles[3].offset, 120, 'f').tolist(), range(3, 33))
+
+        big = self.heap.alloc(5000)
+        self.assertEqual(len(big.buffer.data), 8192)
+
+    def testDefragment(self):
+        handles = [self.heap.write(numpy.arange(i, i+30, dtype='f')) for i in xrange(16)]
+        for handle in handles[::2]:
+            handle.free()
+        self.assertEqual(len(self.heap.arenas), 2)
+        self.assert_(self.heap.stats['fragmentation'] > 0)
+
+        moved = []
+        for handle in handles:
+            handle.onMove = moved.append
+        oldBuffers = [arena.buffer for arena in self.heap.arenas]
+        self.assertEqual(self.heap.defragment(), 8)
+        self.assertEqual(len(moved), 8)
+        self.assertEqual(len(self.heap.arenas), 1)
+        self.assert_(all(b.released for b in oldBuffers))
+        self.assertEqual(self.heap.stats['fragmentation'], 0)
+
+        for i, handle in enumerate(handles):
+            if i % 2:
+                data = handle.buffer.getDataAt(handle.offset, 120, 'f')
+                self.assertEqual(data.tolist(), range(i, i+30))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
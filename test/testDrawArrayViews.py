@@ -0,0 +1,76 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from numpy import array, arange
+from TG.ext.openGL.data.drawArrayViews import narrowIndices, elementGroups, DrawElementArrayView
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class TestDrawArrayViews(unittest.TestCase):
+    def testNarrowIndices(self):
+        arr, indexRange = narrowIndices(array([3, 200, 7], 'I'))
+        self.assertEqual((arr.dtype.char, indexRange), ('B', (3, 200)))
+        arr, indexRange = narrowIndices(array([3, 300], 'I'))
+        self.assertEqual(arr.dtype.char, 'H')
+        arr, indexRange = narrowIndices(array([3, 7], 'I'), 'H')
+        self.assertEqual(arr.dtype.char, 'H')
+
+        self.assertRaises(ValueError, narrowIndices, array([0, -1]))
+        self.assertRaises(ValueError, narrowIndices, array([0, 1<<32], 'q'))
+
+    def testNarrowCache(self):
+        indices = arange(10, dtype='I')
+        view = DrawElementArrayView()
+        view.bind('tris', indices, narrow='cached')
+        narrowed = view.data
+        self.assertEqual(narrowed.dtype.char, 'B')
+        self.assert_(view.bind('tris', indices, narrow='cached').data is narrowed)
+
+        # a plain bind always narrows afresh
+        indices[0] = 1000
+        view.bind('tris', indices)
+        self.assertEqual((view.indexType, view.indexRange), ('H', (1, 1000)))
+        self.assertEqual(view.data[0], 1000)
+
+    def testElementGroups(self):
+        counts, offsets = elementGroups([(0, 6), slice(12, 15), (6, 9)])
+        self.assertEqual(counts.tolist(), [6, 3, 3])
+        self.assertEqual(offsets.tolist(), [0, 12, 6])
+        counts, offsets = elementGroups([])
+        self.assertEqual((counts.size, offsets.size), (0, 0))
+
+    def testBindRanges(self):
+        indices = arange(300, dtype='I')
+        view = DrawElementArrayView()
+        view.bindRanges('tris', indices, [(0, 6), (12, 15)])
+        self.assertEqual(view.groupCounts.tolist(), [6, 3])
+        self.assertEqual(view.groupOffsets.tolist(), [0, 12])
+        base = view.data.ctypes.data
+        self.assertEqual(view._groupPtrs.tolist(), [base, base + 12*2])
+
+    def testGroupsWithoutOffsets(self):
+        view = DrawElementArrayView()
+        view.bind('tris', arange(12), counts=[6, 3, 3])
+        self.assertEqual(view.groupOffsets.tolist(), [0, 6, 9])
+        self.assertRaises(ValueError, view.bind, 'tris', arange(12), [6, 3], [0])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
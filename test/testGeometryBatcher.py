@@ -0,0 +1,81 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from numpy import array, arange, zeros
+from TG.ext.openGL.data.drawArrayViews import drawModes
+from TG.ext.openGL.data.geometryBatcher import GeometryBatch, GeometryBatcher
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def verts(n, start=0):
+    return arange(start, start+n*3, dtype='f').reshape(n, 3)
+
+class TestGeometryBatcher(unittest.TestCase):
+    def testMergeTris(self):
+        batch = GeometryBatch('key', 'tris')
+        batch.add(verts(3), [0, 1, 2], colors=zeros((3, 4), 'B'))
+        batch.add(verts(4, 9), [0, 1, 2, 2, 1, 3], colors=zeros((4, 4), 'B'))
+        attrs, glid_mode, indices = batch.merge()
+
+        self.assertEqual(glid_mode, drawModes['tris'])
+        self.assertEqual(indices.dtype.char, 'H')
+        self.assertEqual(indices.tolist(), [0, 1, 2, 3, 4, 5, 5, 4, 6])
+        self.assertEqual(attrs[0].tolist(), verts(7).tolist())
+        self.assertEqual(attrs[1].shape, (7, 4))
+        self.assertEqual(attrs[2], None)
+
+    def testMergeTriStrips(self):
+        batch = GeometryBatch('key', 'triStrip')
+        batch.add(verts(4), [0, 1, 2, 3])
+        batch.add(verts(3), [0, 1, 2])
+        attrs, glid_mode, indices = batch.merge()
+
+        self.assertEqual(glid_mode, drawModes['triStrip'])
+        self.assertEqual(indices.tolist(), [0, 1, 2, 3, 3, 4, 4, 5, 6])
+
+    def testMergeLineStrips(self):
+        batch = GeometryBatch('key', 'lineStrip')
+        batch.add(verts(3), [0, 1, 2])
+        batch.add(verts(2), [0, 1])
+        attrs, glid_mode, indices = batch.merge()
+
+        self.assertEqual(glid_mode, drawModes['lines'])
+        self.assertEqual(indices.tolist(), [0, 1, 1, 2, 3, 4])
+
+    def testMismatchedAttributes(self):
+        batch = GeometryBatch('key', 'tris')
+        batch.add(verts(3), [0, 1, 2])
+        self.assertRaises(ValueError, batch.add, verts(3), [0, 1, 2], zeros((3, 4), 'B'))
+
+    def testStats(self):
+        batcher = GeometryBatcher()
+        batcher.add('a', verts(3), [0, 1, 2])
+        batcher.add('a', verts(5), [0, 1, 2])
+        stats = batcher.stats
+        self.assertEqual(stats['chunkSizeMean'], 4.)
+        self.assertEqual(stats['chunkSizeMax'], 5)
+
+        batcher.clear()
+        batcher.resetStats()
+        self.assertEqual(batcher.stats['chunkSizeMax'], 0)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,75 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from TG.ext.openGL.data.memoryRegistry import MemoryRegistry, mipChainBytes
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class Resource(object):
+    pass
+
+class TestMemoryRegistry(unittest.TestCase):
+    def testMipChain(self):
+        self.assertEqual(mipChainBytes((4, 4), 4), (16+4+1)*4)
+        self.assertEqual(mipChainBytes((4, 1), 1), 4+2+1)
+
+    def testTotals(self):
+        registry = MemoryRegistry()
+        a, b, c = Resource(), Resource(), Resource()
+        registry.track(a, 'buffer', 1000, owner='mesh')
+        registry.track(b, 'buffer', 500, owner='mesh')
+        registry.track(c, 'texture', 4000, owner='font')
+        registry.track(a, 'buffer', 2000, owner='mesh')
+        self.assertEqual(registry.total, 6500)
+        self.assertEqual(registry.getTotal('buffer'), 2500)
+        self.assertEqual(registry.report(), [('font', 1, 4000), ('mesh', 2, 2500)])
+
+        registry.untrack(c)
+        del b
+        self.assertEqual(registry.total, 2000)
+        self.assertEqual(registry.highWater[None], 6500)
+        self.assertEqual(registry.report('kind'), [('buffer', 1, 2000)])
+
+    def testBudget(self):
+        registry = MemoryRegistry(budget=3000)
+        resources = [Resource() for i in xrange(4)]
+        def evict(registry, excess):
+            for record in registry.leastRecentlyUsed(minAge=0):
+                if excess <= 0:
+                    break
+                excess -= record.nbytes
+                registry.untrack(record.object)
+        registry.addBudgetCallback(evict)
+
+        for i, res in enumerate(resources):
+            registry.track(res, 'buffer', 1000)
+            registry.nextFrame()
+        registry.touch(resources[0])
+        self.assertEqual(registry.total, 3000)
+
+        texture = Resource()
+        registry.track(texture, 'texture', 1500)
+        self.assertEqual(registry.total, 2500)
+        self.assertEqual([r.object for r in registry.leastRecentlyUsed(minAge=0)], [resources[3], texture])
+        self.assert_(registry.checkBudget())
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
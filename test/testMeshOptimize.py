@@ -0,0 +1,90 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from numpy import array, arange, random
+from TG.ext.openGL.data import meshOptimize
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def gridQuads(n):
+    idx = arange((n+1)*(n+1)).reshape(n+1, n+1)
+    quads = array([idx[:-1,:-1], idx[:-1,1:], idx[1:,1:], idx[1:,:-1]]).transpose(1, 2, 0)
+    verts = array([(x, y, 0) for y in xrange(n+1) for x in xrange(n+1)], 'f')
+    return verts, quads.reshape(-1)
+
+def triSet(indices):
+    """Triangles as rotation-normalized tuples, preserving winding"""
+    result = []
+    for tri in array(indices).reshape(-1, 3).tolist():
+        i = tri.index(min(tri))
+        result.append(tuple(tri[i:] + tri[:i]))
+    return sorted(result)
+
+class TestMeshOptimize(unittest.TestCase):
+    def testDedupe(self):
+        verts = array([[0, 0], [1, 0], [0, 1], [1, 0], [0, 1], [1, 1]], 'f')
+        colors = array([[0], [1], [2], [1], [2], [3]], 'B')
+        v, idx, attrs = meshOptimize.dedupeVertices(verts, None, [colors])
+        self.assertEqual(v.tolist(), [[0, 0], [1, 0], [0, 1], [1, 1]])
+        self.assertEqual(idx.tolist(), [0, 1, 2, 1, 2, 3])
+        self.assertEqual(attrs[0].ravel().tolist(), [0, 1, 2, 3])
+
+        colors[3] = 9
+        v, idx, attrs = meshOptimize.dedupeVertices(verts, None, [colors])
+        self.assertEqual(len(v), 5)
+
+    def testQuadsToTriangles(self):
+        tris = meshOptimize.quadsToTriangles([0, 1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(tris.tolist(), [0, 1, 2, 0, 2, 3, 4, 5, 6, 4, 6, 7])
+
+    def testVertexCache(self):
+        verts, quads = gridQuads(24)
+        tris = meshOptimize.quadsToTriangles(quads).reshape(-1, 3)
+        tris = tris[random.RandomState(7).permutation(len(tris))].reshape(-1)
+
+        optimized = meshOptimize.optimizeVertexCache(tris, 16)
+        self.assertEqual(triSet(optimized), triSet(tris))
+        self.assert_(meshOptimize.acmr(optimized, 16) < 0.8)
+        self.assert_(meshOptimize.acmr(tris, 16) > 2.)
+
+    def testStrips(self):
+        verts, quads = gridQuads(6)
+        tris = meshOptimize.quadsToTriangles(quads)
+        strips = meshOptimize.triangleStrips(tris)
+        self.assert_(len(strips) < len(tris) // 3)
+        joined = meshOptimize.joinStrips(strips)
+        self.assertEqual(triSet(meshOptimize.stripToTriangles(joined)), triSet(tris))
+
+    def testOptimizeMesh(self):
+        verts, quads = gridQuads(10)
+        unindexed = verts[quads]
+        mesh = meshOptimize.optimizeMesh(unindexed, mode='quads')
+        self.assertEqual(mesh.mode, 'tris')
+        self.assertEqual(len(mesh.vertices), len(verts))
+        self.assertEqual(mesh.report['vertexCountBefore'], 400)
+        self.assert_(mesh.report['acmrAfter'] <= mesh.report['acmrBefore'])
+
+        mesh = meshOptimize.optimizeMesh(unindexed, mode='quads', strips=True)
+        self.assertEqual(mesh.mode, 'triStrip')
+        self.assertEqual(len(meshOptimize.stripToTriangles(mesh.indices)), 600)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
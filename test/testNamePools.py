@@ -0,0 +1,73 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from TG.ext.openGL.data.namePools import NamePool, sizeClass
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class TestNamePools(unittest.TestCase):
+    def setUp(self):
+        self.nextName = 1
+        self.deleted = []
+        self.pool = NamePool(self.genNames, self.delNames, highWater=4, batchSize=2)
+
+    def genNames(self, n, names):
+        for i in xrange(n):
+            names[i] = self.nextName
+            self.nextName += 1
+
+    def delNames(self, n, names):
+        self.deleted.extend(names[:n])
+
+    def testSizeClass(self):
+        self.assertEqual([sizeClass(n) for n in (0, 256, 257, 5000)], [256, 256, 512, 8192])
+
+    def testAcquire(self):
+        pool = self.pool
+        self.assertEqual(pool.acquire(), (1, None))
+        self.assertEqual(pool.acquire(), (2, None))
+        self.assertEqual(pool.generated, 2)
+
+        pool.recycle(1, 'a')
+        pool.recycle(2, 'b')
+        self.assertEqual(pool.acquire('b', exact=True), (2, 'b'))
+        self.assertEqual(pool.acquire('c', exact=True), (None, None))
+        self.assertEqual(pool.acquire('c'), (1, None))
+        self.assertEqual(pool.stats['reusedStorage'], 1)
+        self.assertEqual(pool.stats['reusedName'], 1)
+        self.assertEqual(pool.stats['live'], 2)
+
+    def testHighWater(self):
+        pool = self.pool
+        names = [pool.acquire()[0] for i in xrange(6)]
+        for name in names:
+            pool.recycle(name, name % 2)
+        self.assertEqual(pool.idleCount, 4)
+        self.assertEqual(self.deleted, names[:2])
+        self.assertEqual(pool.peakIdle, 5)
+        self.assertEqual(pool.peakLive, 6)
+
+        self.assertEqual(pool.trim(1), 3)
+        self.assertEqual(pool.acquire(0, exact=True), (names[-1], 0))
+        self.assertEqual(pool.clear(), 0)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,96 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+import numpy
+from TG.ext.openGL.selection import PickCache, NameSelector
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class TileSelector(object):
+    """Stands in for StencilSelector: item 1 covers x < 50, item 2 the rest"""
+    def __init__(self):
+        self.picks = []
+
+    def pickMatrix(self, pos, size, vpbox):
+        self.picks.append((pos, size, vpbox))
+        self.pickRect = pos, size
+
+    def selectIds(self, render):
+        (x0, y0), (w, h) = self.pickRect
+        xs = numpy.arange(x0, x0 + w)
+        ids = numpy.where(xs < 50, 1, 2)[None, :].repeat(h, 0)
+        return ids, {1: 'left', 2: 'right'}
+
+class ViewportPickCache(PickCache):
+    def _viewport(self):
+        return (0, 0, 40, 20)
+
+def render(selector):
+    pass
+
+class TestPickCache(unittest.TestCase):
+    vpbox = (0, 0, 100, 100)
+
+    def testHits(self):
+        cache = PickCache(TileSelector())
+        self.assertEqual(cache.pick((40, 50), render, self.vpbox), [['left']])
+        self.assertEqual(cache.pick((52, 60), render, self.vpbox), [['right']])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # outside the cached tile
+        self.assertEqual(cache.pick((90, 50), render, self.vpbox), [['right']])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(cache.hitRate, 1./3)
+
+    def testInvalidation(self):
+        cache = PickCache(TileSelector())
+        cache.pick((40, 50), render, self.vpbox)
+        cache.invalidate()
+        cache.pick((40, 50), render, self.vpbox)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+        cache.pick((40, 50), render, self.vpbox, sceneVersion=7)
+        cache.pick((40, 50), render, self.vpbox, sceneVersion=7)
+        cache.pick((40, 50), render, self.vpbox, sceneVersion=8)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+    def testClampToViewport(self):
+        selector = TileSelector()
+        cache = PickCache(selector)
+        cache.pick((98, 2), render, self.vpbox)
+        self.assertEqual(selector.picks[-1][:2], ((68, 0), (32, 32)))
+
+        cache = ViewportPickCache(selector)
+        self.assertEqual(cache.pick((30, 15), render), [['left']])
+        self.assertEqual(selector.picks[-1], ((8, 0), (32, 20), (0, 0, 40, 20)))
+
+    def testOutsideViewport(self):
+        selector = TileSelector()
+        cache = PickCache(selector)
+        self.assertEqual(cache.pick((120, 50), render, self.vpbox), [])
+        self.assertEqual(cache.pick((-1, 50), render, self.vpbox), [])
+        self.assertEqual((cache.hits, cache.misses, selector.picks), (0, 0, []))
+
+    def testSelectorType(self):
+        self.assertRaises(TypeError, PickCache, NameSelector())
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,66 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+import numpy
+from numpy import random
+from TG.ext.openGL.data import quantize
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class TestQuantize(unittest.TestCase):
+    def setUp(self):
+        random.seed(42)
+
+    def testPositionRoundTrip(self):
+        positions = random.uniform(-20., 50., (500, 3))
+        q = quantize.quantizePositions(positions, 1e-4)
+        self.assertEqual(q.data.dtype.char, 'h')
+
+        homogeneous = numpy.column_stack([q.data, numpy.ones(len(q.data))])
+        decoded = numpy.dot(homogeneous, q.matrix.T)[:, :3]
+        extent = (positions.max(0) - positions.min(0)).max()
+        self.assert_(abs(decoded - positions).max() <= 1e-4 * extent)
+        self.assertAlmostEqual(abs(decoded - positions).max(), q.maxError)
+
+    def testTexCoordRoundTrip(self):
+        texcoords = random.uniform(0., 1., (200, 2))
+        q = quantize.quantizeTexCoords(texcoords)
+        homogeneous = numpy.column_stack([q.data, numpy.zeros(len(q.data)), numpy.ones(len(q.data))])
+        decoded = numpy.dot(homogeneous, q.matrix.T)[:, :2]
+        self.assert_(abs(decoded - texcoords).max() <= 1e-4)
+
+    def testHomogeneousPositions(self):
+        positions = random.uniform(-1., 1., (50, 4))
+        q = quantize.quantizePositions(positions)
+        self.assertEqual(q.data.dtype.char, 'f')
+        self.assert_(not q.hasTransform())
+        self.assertRaises(ValueError, quantize.quantize, 'vertex', positions, None, ('h',))
+
+    def testNormals(self):
+        normals = random.normal(size=(100, 3))
+        normals /= numpy.sqrt((normals**2).sum(-1))[:, None]
+        q = quantize.quantizeNormals(normals)
+        self.assertEqual(q.data.dtype.char, 'b')
+        self.assert_(q.normalized)
+        self.assert_(abs(q.decode() - normals).max() <= 1e-2)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,85 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+from numpy import arange
+from TG.ext.openGL.raw import gl
+from TG.ext.openGL.data.stripStitching import stitchWithoutRestart, restartIndices, stripsFromVertexArrays
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def stripTriangles(strip):
+    """Non-degenerate triangles of a strip, with odd triangles flipped to
+    the strip's winding"""
+    result = []
+    for i in xrange(len(strip) - 2):
+        tri = list(strip[i:i+3])
+        if i % 2:
+            tri[0], tri[1] = tri[1], tri[0]
+        if len(set(tri)) == 3:
+            result.append(tuple(tri))
+    return result
+
+class TestStripStitching(unittest.TestCase):
+    def testTriStripOddLength(self):
+        mode, indices = stitchWithoutRestart(gl.GL_TRIANGLE_STRIP, [[0, 1, 2], [3, 4, 5, 6]])
+        self.assertEqual(mode, gl.GL_TRIANGLE_STRIP)
+        # an odd first strip needs an extra degenerate to keep the winding
+        self.assertEqual(indices.tolist(), [0, 1, 2, 2, 3, 3, 3, 4, 5, 6])
+        self.assertEqual(stripTriangles(indices.tolist()),
+            stripTriangles([0, 1, 2]) + stripTriangles([3, 4, 5, 6]))
+
+    def testTriStripEvenLength(self):
+        mode, indices = stitchWithoutRestart(gl.GL_TRIANGLE_STRIP, [[0, 1, 2, 3], [4, 5, 6]])
+        self.assertEqual(indices.tolist(), [0, 1, 2, 3, 3, 4, 4, 5, 6])
+        self.assertEqual(stripTriangles(indices.tolist()),
+            stripTriangles([0, 1, 2, 3]) + stripTriangles([4, 5, 6]))
+
+    def testLineStrips(self):
+        mode, indices = stitchWithoutRestart(gl.GL_LINE_STRIP, [[0, 1, 2], [3, 4]])
+        self.assertEqual(mode, gl.GL_LINES)
+        self.assertEqual(indices.tolist(), [0, 1, 1, 2, 3, 4])
+
+        mode, indices = stitchWithoutRestart(gl.GL_LINE_LOOP, [[0, 1, 2], [3, 4]])
+        self.assertEqual(mode, gl.GL_LINES)
+        self.assertEqual(indices.tolist(), [0, 1, 1, 2, 2, 0, 3, 4])
+
+    def testFans(self):
+        mode, indices = stitchWithoutRestart(gl.GL_TRIANGLE_FAN, [[0, 1, 2, 3], [4, 5, 6]])
+        self.assertEqual(mode, gl.GL_TRIANGLES)
+        self.assertEqual(indices.tolist(), [0, 1, 2, 0, 2, 3, 4, 5, 6])
+
+    def testQuadStrips(self):
+        mode, indices = stitchWithoutRestart(gl.GL_QUAD_STRIP, [[0, 1, 2, 3, 4, 5], [6, 7, 8, 9]])
+        self.assertEqual(mode, gl.GL_QUADS)
+        self.assertEqual(indices.tolist(), [0, 1, 3, 2, 2, 3, 5, 4, 6, 7, 9, 8])
+
+    def testEmpty(self):
+        mode, indices = stitchWithoutRestart(gl.GL_LINE_STRIP, [[], []])
+        self.assertEqual((mode, indices.size), (gl.GL_LINES, 0))
+
+    def testRestartIndices(self):
+        self.assertEqual(restartIndices([[0, 1, 2], [3, 4]], 0xffff).tolist(), [0, 1, 2, 0xffff, 3, 4])
+        vertices, strips = stripsFromVertexArrays([arange(6).reshape(3, 2), arange(4).reshape(2, 2)])
+        self.assertEqual(vertices.shape, (5, 2))
+        self.assertEqual([s.tolist() for s in strips], [[0, 1, 2], [3, 4]])
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
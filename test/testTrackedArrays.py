@@ -0,0 +1,82 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import unittest
+
+import numpy
+from TG.ext.openGL.data.trackedArrays import TrackedArray, mergeIntervals
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class RecordingBuffer(object):
+    """Stands in for a GL buffer object, recording uploads"""
+    def __init__(self):
+        self.sends = []
+    def bind(self): pass
+    def unbind(self): pass
+    def sendData(self, data):
+        self.sends.append((0, data.nbytes))
+    def sendDataAt(self, data, offset=0):
+        self.sends.append((offset, data.nbytes))
+
+class TestTrackedArrays(unittest.TestCase):
+    def testMergeIntervals(self):
+        starts, stops = mergeIntervals([50, 0, 10, 30], [60, 12, 20, 40], 5)
+        self.assertEqual(zip(starts, stops), [(0, 20), (30, 40), (50, 60)])
+        starts, stops = mergeIntervals([50, 0, 10, 30], [60, 12, 20, 40], 10)
+        self.assertEqual(zip(starts, stops), [(0, 60)])
+
+    def testFlush(self):
+        buffer = RecordingBuffer()
+        tracked = TrackedArray(buffer, numpy.zeros((1000, 4), 'f'), mergeGap=64)
+        self.assertEqual(buffer.sends, [(0, 16000)])
+        del buffer.sends[:]
+
+        tracked[10] = 1
+        tracked[12:14] = 2
+        tracked[[500, 501, 900]] = 3
+        tracked[-1, 2] = 4
+        self.assertEqual(tracked.flush(), 4)
+        self.assertEqual(buffer.sends, [(160, 64), (8000, 32), (14400, 16), (15984, 16)])
+        self.assertEqual(tracked.flush(), 0)
+
+    def testMark(self):
+        buffer = RecordingBuffer()
+        tracked = TrackedArray(buffer, numpy.zeros(100, 'H'), mergeGap=0, upload=False)
+        tracked.data[20:30] = 7
+        tracked.mark(20, 30)
+        tracked[tracked.data == 0] = 1
+        self.assertEqual(tracked.flush(), 1)
+        self.assertEqual(buffer.sends, [(0, 200)])
+
+    def testMarkMask2d(self):
+        buffer = RecordingBuffer()
+        data = numpy.zeros((10, 4), 'f')
+        data[7, 2] = 9
+        data[2, 0] = 9
+        tracked = TrackedArray(buffer, data, mergeGap=0)
+        del buffer.sends[:]
+
+        tracked[tracked.data > 5] = 1
+        self.assertEqual(tracked.flush(), 2)
+        self.assertEqual(buffer.sends, [(32, 16), (112, 16)])
+        self.assertEqual(tracked.data[7, 2], 1)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+
@@ -0,0 +1,84 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+import tempfile
+import unittest
+
+import numpy
+from TG.ext.openGL.data.vertexFile import VertexFile, VertexFileError, writeVertexFile, headerFormat
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class TestVertexFile(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp('.tgvf')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def testRoundTrip(self):
+        vertices = numpy.arange(30, dtype='f').reshape(10, 3)
+        colors = numpy.arange(40, dtype='B').reshape(10, 4)
+        weights = numpy.arange(10, dtype='H')
+        indices = numpy.array([0, 1, 2, 2, 1, 3], 'H')
+        written = writeVertexFile(self.path, [
+                ('vertex', vertices), ('color', colors),
+                ('vertex_attrib', weights, 'weight', True),
+                ('draw_elements', indices, 'tris')], chunkBytes=16)
+
+        vf = VertexFile(self.path)
+        self.assertEqual([a.offset for a in vf], [a.offset for a in written])
+        self.assert_(all(a.offset % 16 == 0 for a in vf))
+        self.assertEqual(vf.find('vertex').shape, (10, 3))
+        self.assertEqual(vf.find('vertex_attrib', 'weight').normalized, True)
+        self.assertEqual(vf.find('draw_elements').name, 'tris')
+
+        self.assertEqual(vf.array('vertex').tolist(), vertices.tolist())
+        self.assertEqual(vf.array('color').tolist(), colors.tolist())
+        self.assertEqual(vf.array('vertex_attrib').dtype, numpy.dtype('H'))
+        self.assertEqual(vf.array('draw_elements').tolist(), indices.tolist())
+
+    def testBadFile(self):
+        open(self.path, 'wb').write('not a vertex file at all')
+        self.assertRaises(VertexFileError, VertexFile, self.path)
+
+    def testLongName(self):
+        self.assertRaises(VertexFileError, writeVertexFile, self.path,
+                [('vertex_attrib', numpy.zeros(4, 'f'), 'a'*25)])
+        writeVertexFile(self.path, [('vertex_attrib', numpy.zeros(4, 'f'), 'a'*24)])
+        self.assertEqual(VertexFile(self.path).find('vertex_attrib').name, 'a'*24)
+
+    def testTruncatedFile(self):
+        writeVertexFile(self.path, [('vertex', numpy.zeros((10, 3), 'f'))])
+        raw = open(self.path, 'rb').read()
+
+        open(self.path, 'wb').write(raw[:-4])
+        self.assertRaises(VertexFileError, VertexFile, self.path)
+        open(self.path, 'wb').write(raw[:headerFormat.size + 10])
+        self.assertRaises(VertexFileError, VertexFile, self.path)
+
+        header = list(headerFormat.unpack(raw[:headerFormat.size]))
+        header[3] += 1
+        open(self.path, 'wb').write(headerFormat.pack(*header) + raw[headerFormat.size:])
+        self.assertRaises(VertexFileError, VertexFile, self.path)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Unittest Main
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+if __name__=='__main__':
+    unittest.main()
+